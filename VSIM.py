@@ -1,610 +1,3067 @@
-import sys
-
-def twos_complement_to_decimal(binary_string):
-    if binary_string[0] == '1':
-        # If the most significant bit is 1, it's a negative number in two's complement
-        # Perform two's complement operation
-        inverted_bits = ''.join('1' if bit == '0' else '0' for bit in binary_string)
-        decimal_value = -(int(inverted_bits, 2) + 1)
-    else:
-        # If the most significant bit is 0, it's a positive number
-        decimal_value = int(binary_string, 2)
-    return decimal_value
-
-class Instruction:
-    def __init__(self, binary):
-        self.binary = binary
-        self.inst_count = None
-        self.category = None
-        self.type = None
-        self.active = False
-        self.source_1 = None
-        self.source_2 = None
-        self.destination = None
-        self.immediate = None
-        self.inst_print = None
-        self.stop_moving = False
-        self.temp_ans = None
-        self.is_first_sw = False
-        self.is_branch = False
-        self.is_logical = False
-        self.is_arithematic = False
-        self.is_sw_or_lw = False
-        self.find_category()
-        self.find_type()
-        self.find_src_and_dest_and_imm()
-        self.get_instruction_print()
-
-    def find_category(self):
-        temp_cat = self.binary[30:32]
-        if temp_cat == "00":
-            self.category = 1   
-        elif temp_cat == "01":
-            self.category = 2
-        elif temp_cat == "10":
-            self.category = 3
-        elif temp_cat == "11":
-            self.category = 4
-    
-    def find_type(self) -> str:
-        temp_type = self.binary[25:30]
-        if self.category == 1:
-            if temp_type == "00000":
-                self.type = "beq"
-                self.is_branch = True
-            elif temp_type == "00001":
-                self.type = "bne"
-                self.is_branch = True
-            elif temp_type == "00010":
-                self.type = "blt"
-                self.is_branch = True
-            elif temp_type == "00011":
-                self.type = "sw"
-                self.is_sw_or_lw = True
-
-        elif self.category == 2:
-            if temp_type == "00000":
-                self.type = "add"
-                self.is_arithematic = True
-            elif temp_type == "00001":
-                self.type = "sub"
-                self.is_arithematic = True
-            elif temp_type == "00010":
-                self.type = "and"
-                self.is_logical = True
-            elif temp_type == "00011":
-                self.type = "or"
-                self.is_logical = True
-
-        elif self.category == 3:
-            if temp_type == "00000":
-                self.type = "addi"
-                self.is_arithematic = True
-            elif temp_type == "00001":
-                self.type = "andi"
-                self.is_logical = True                
-            elif temp_type == "00010":
-                self.type = "ori"
-                self.is_logical = True
-            elif temp_type == "00011":
-                self.type = "sll"
-                self.is_logical = True
-            elif temp_type == "00100":
-                self.type = "sra"
-                self.is_logical = True
-            elif temp_type == "00101":
-                self.type = "lw"
-                self.is_sw_or_lw = True
-
-        elif self.category == 4:
-            if temp_type == "00000":
-                self.type = "jal"
-                self.is_branch = True
-            elif temp_type == "11111":
-                self.type = "break"
-    
-    def find_src_and_dest_and_imm(self):
-        if self.category == 1:
-            self.source_1 = int(self.binary[12:17], 2)
-            self.source_2 = int(self.binary[7:12], 2)
-            self.immediate = twos_complement_to_decimal(self.binary[0:7]+self.binary[20:25])
-        elif self.category == 2:
-            self.source_1 = int(self.binary[12:17], 2)
-            self.source_2 = int(self.binary[7:12], 2)
-            self.destination = int(self.binary[20:25], 2)
-        elif self.category == 3:
-            self.source_1 = int(self.binary[12:17], 2)
-            self.destination = int(self.binary[20:25], 2)
-            self.immediate = twos_complement_to_decimal(self.binary[0:12])
-        elif self.category == 4:
-            self.immediate = twos_complement_to_decimal(self.binary[0:20])
-            self.destination = int(self.binary[20:25], 2)
-    
-    def get_instruction_print(self):
-        if self.category == 1:
-            if self.type == "beq" or self.type == "bne" or self.type == "blt":
-                self.inst_print = self.type+" x"+str(self.source_1)+", x"+str(self.source_2)+", #"+str(self.immediate)
-            elif self.type == "sw":
-                self.inst_print = "sw "+"x"+str(self.source_1)+", "+str(self.immediate)+"(x"+str(self.source_2)+")"
-        elif self.category == 2:
-            self.inst_print = self.type+" x"+str(self.destination)+", x"+str(self.source_1)+", x"+str(self.source_2)
-        elif self.category == 3:
-            if self.type == "addi" or self.type == "andi" or self.type == "ori" or self.type == "sll" or self.type == "sra":
-                self.inst_print = self.type+" x"+str(self.destination)+", x"+str(self.source_1)+", #"+str(self.immediate)
-            elif self.type == "lw":
-                self.inst_print = "lw "+"x"+str(self.destination)+", "+str(self.immediate)+"(x"+str(self.source_1)+")"
-        elif self.category == 4:
-            if self.type == 'jal':
-                self.inst_print = "jal "+"x"+str(self.destination)+", #"+str(self.immediate)
-            elif self.type == 'break':
-                self.inst_print = "break"
-
-class Buffer:
-    def __init__(self, size):
-        self.size = size
-        self.buffer = []
-        self.first_sw = False
-        self.is_waiting = None
-    
-    def enqueue(self, item):
-        if len(self.buffer) < self.size:
-            self.buffer.append(item)
-        else:
-            raise Exception("Buffer full")
-    
-    def dequeue(self):
-        if len(self.buffer) == 0:
-            raise Exception("Buffer empty")
-        else:
-            return self.buffer.pop(0)
-
-    def arbitrary_remove(self, index):
-        if index < len(self.buffer):
-            return self.buffer.pop(index)
-        else:
-            raise Exception("Index out of bounds")
-    
-    def is_empty(self):
-        if (len(self.buffer) == 0):
-            return True
-        else:
-            return False
-
-    def is_full(self):
-        if (len(self.buffer) == self.size):
-            return True
-        else:
-            return False
-class Processing:
-    def __init__(self):
-        self.memory_stack = {}
-        self.instruction_stack = {}
-        self.register_stack = [0]*32
-        self.program_end = None
-        self.all_instructions = {}
-        self.program_counter = 256
-        self.break_instruction_count = 0
-        self.stop_fetch = False
-        self.is_inst_dep = False
-        self.is_structural_dep = False
-        self.active_inst_list = []
-        self.cycle = 1
-        self.process_alu1 = True
-        self.process_alu2 = True
-        self.process_alu3 = True
-        self.stop = False
-        self.next_fetch = True
-        
-        self.l_pre_issue = Buffer(4)
-        self.r_pre_issue = Buffer(4)
-
-        self.l_pre_alu1 = Buffer(2)
-        self.r_pre_alu1 = Buffer(2)
-
-        self.l_pre_alu2 = Buffer(1)
-        self.r_pre_alu2 = Buffer(1)
-        self.l_post_alu2 = Buffer(1)
-        self.r_post_alu2 = Buffer(1)
-
-        self.l_pre_alu3 = Buffer(1)
-        self.r_pre_alu3 = Buffer(1)
-        self.l_post_alu3 = Buffer(1)
-        self.r_post_alu3 = Buffer(1)
-
-        self.l_pre_mem = Buffer(1)
-        self.r_pre_mem = Buffer(1)
-        self.l_post_mem = Buffer(1)
-        self.r_post_mem = Buffer(1)
-
-        self.exec = Buffer(1)
-        self.wait = Buffer(1)
-    
-
-    # def dependency_check(self, inst_list, curr_inst):
-    #     for i in inst_list:
-    #         #RAW
-    #         if(curr_inst.source_1 != None and curr_inst.source_1 == i.destination):
-    #             return True
-    #         if(curr_inst.source_2 != None and curr_inst.source_2 == i.destinatoion):
-    #             return True
-    #         #Pre issue is full
-    #         if(len(self.pre_issue)==self.pre_issue.size):
-    #             return True
-    
-    def dependency_check(self, inst_list, curr_inst):
-        for i in inst_list:
-            if(curr_inst.source_1 != None and i.destination != None and curr_inst.source_1 == i.destination):
-                return True
-            if(curr_inst.source_2 != None and i.destination != None and curr_inst.source_2 == i.destination):
-                return True
-            if(curr_inst.destination != None and i.destination != None and curr_inst.destination == i.destination):
-                return True
-            if(curr_inst.destination != None and i.source_1 != None and curr_inst.destination == i.source_1):
-                return True
-            if(curr_inst.destination != None and i.source_2 != None and curr_inst.destination == i.source_2):
-                return True
-        return False
-
-    def structural_dependency(self, curr_inst):
-        if(curr_inst.is_logical and self.r_pre_alu3.is_full()):
-            return True
-        elif(curr_inst.is_arithematic and self.r_pre_alu2.is_full()):
-            return True
-        elif(curr_inst.is_sw_or_lw and self.r_pre_alu1.is_full()):
-            return True
-        return False
-    
-    def process_branch(self, instruction_1):
-        if(instruction_1.type == 'jal'):
-            self.register_stack[instruction_1.destination] = self.program_counter + 4
-            self.program_counter += instruction_1.immediate * 2
-        elif(instruction_1.type == 'beq'):
-            if(self.register_stack[instruction_1.source_1] == self.register_stack[instruction_1.source_2]):
-                self.program_counter += (instruction_1.immediate * 2)
-            else:
-                self.program_counter += 4
-        elif(instruction_1.type == 'bne'):
-            if(self.register_stack[instruction_1.source_1] != self.register_stack[instruction_1.source_2]):
-                self.program_counter += (instruction_1.immediate * 2)
-            else:
-                self.program_counter += 4
-        elif(instruction_1.type == 'blt'):
-            if(self.register_stack[instruction_1.source_1] < self.register_stack[instruction_1.source_2]):
-                self.program_counter += (instruction_1.immediate * 2)
-            else:
-                self.program_counter += 4
-    def remove_active(self, inst):
-        for i in range(len(self.active_inst_list)):
-            if self.active_inst_list[i].binary == inst.binary:
-                self.active_inst_list.pop(i)
-                break
-    
-    def display_cycle_registers(self, f_sim):
-        f_sim.write(f"Registers")
-        for i in range(32):
-            if i % 8 == 0:
-                f_sim.write(f"\nx{i:02d}:")
-            f_sim.write(f"\t{self.register_stack[i]}")
-        f_sim.write(f"\nData")
-        i = 0
-        for mem_ad in sorted(list(self.memory_stack.keys())):
-            if i % 8 == 0:
-                f_sim.write(f"\n{mem_ad}:")
-            f_sim.write(f"\t{self.memory_stack[mem_ad]}")
-            i+=1
-        if(not self.stop):
-            f_sim.write('\n')
-
-    def print_snapshot(self,f):
-        f.write('-'*20)
-        f.write('\n')
-        f.write(f'Cycle {self.cycle}:\n\n')
-        f.write(f'IF Unit:\n')
-        if len(self.wait.buffer) != 0:
-            f.write(f'\tWaiting: [{self.wait.buffer[0].inst_print}]\n')
-        else:
-            f.write(f'\tWaiting:\n')
-        if len(self.exec.buffer) == 0:
-            f.write(f'\tExecuted:\n')
-        else:
-            f.write(f'\tExecuted: [{self.exec.buffer[0].inst_print}]\n')
-        f.write('Pre-Issue Queue:\n')
-        for i in range(4):
-            if i < len(self.r_pre_issue.buffer):
-                f.write(f'\tEntry {i}: [{self.r_pre_issue.buffer[i].inst_print}]\n')
-            else:
-                f.write(f'\tEntry {i}:\n')
-        f.write('Pre-ALU1 Queue:\n')
-        for i in range(2):
-            if i < len(self.r_pre_alu1.buffer):
-                f.write(f'\tEntry {i}: [{self.r_pre_alu1.buffer[i].inst_print}]\n')
-            else:
-                f.write(f'\tEntry {i}:\n')
-        if len(self.r_pre_mem.buffer) == 0:
-            f.write(f'Pre-MEM Queue:\n')
-        else:
-            f.write(f'Pre-MEM Queue: [{self.r_pre_mem.buffer[0].inst_print}]\n')
-        if len(self.r_post_mem.buffer) == 0:
-            f.write(f'Post-MEM Queue:\n')
-        else:
-            f.write(f'Post-MEM Queue: [{self.r_post_mem.buffer[0].inst_print}]\n')
-        if len(self.r_pre_alu2.buffer) == 0:
-            f.write(f'Pre-ALU2 Queue:\n')
-        else:
-            f.write(f'Pre-ALU2 Queue: [{self.r_pre_alu2.buffer[0].inst_print}]\n')
-        if len(self.r_post_alu2.buffer) == 0:
-            f.write(f'Post-ALU2 Queue:\n')
-        else:
-            f.write(f'Post-ALU2 Queue: [{self.r_post_alu2.buffer[0].inst_print}]\n')
-        if len(self.r_pre_alu3.buffer) == 0:
-            f.write(f'Pre-ALU3 Queue:\n')
-        else:
-            f.write(f'Pre-ALU3 Queue: [{self.r_pre_alu3.buffer[0].inst_print}]\n')
-        if len(self.r_post_alu3.buffer) == 0:
-            f.write(f'Post-ALU3 Queue:\n')
-        else:
-            f.write(f'Post-ALU3 Queue: [{self.r_post_alu3.buffer[0].inst_print}]\n')
-        f.write('\n')
-        self.display_cycle_registers(f)
-
-
-
-    def fetch(self):
-        #Attempt 3s
-        # if self.next_fetch == False:
-        #     self.next_fetch = True
-        #     return
-        instruction_1 = Instruction(self.all_instructions[self.program_counter])
-        # self.program_counter += 4
-        if len(self.l_pre_issue.buffer) + len(self.r_pre_issue.buffer) < self.l_pre_issue.size:
-            if(len(self.exec.buffer) == 1):
-                    inst = self.exec.dequeue()
-                    # self.remove_active(inst)
-            if instruction_1.type == "break" and len(self.exec.buffer) == 0 and len(self.wait.buffer) == 0:
-                self.exec.enqueue(instruction_1)
-                # self.program_counter += 4
-                self.stop = True
-                return
-            if(len(self.wait.buffer)) == 1: # already an instruction is waititg and now is dependency free
-                if not self.dependency_check(self.active_inst_list, instruction_1) and not self.dependency_check(self.r_pre_issue.buffer, instruction_1):
-                    instruction_1 = self.wait.dequeue()
-                    self.exec.enqueue(instruction_1)
-                    self.process_branch(instruction_1)
-                    # self.stop_fetch = True
-                return
-            self.is_inst_dep = self.dependency_check(self.active_inst_list, instruction_1) or self.dependency_check(self.r_pre_issue.buffer, instruction_1)
-            self.is_structural_dep = False if len(self.r_pre_issue.buffer) + len(self.l_pre_issue.buffer) + len(self.exec.buffer) + len(self.wait.buffer) < 4 else True
-            # self.active_inst_list.append(instruction_1)
-            if(instruction_1.is_branch):
-                if(self.is_inst_dep):
-                    self.wait.enqueue(instruction_1)
-                    # self.active_inst_list.append(instruction_1)
-                    # self.stop_fetch = True
-                else:
-                    self.exec.enqueue(instruction_1)
-                    self.process_branch(instruction_1)
-                    # self.active_inst_list.append(instruction_1)
-            else:
-                self.l_pre_issue.enqueue(instruction_1)
-                # self.active_inst_list.append(instruction_1)
-                self.program_counter += 4
-                if len(self.l_pre_issue.buffer) + len(self.r_pre_issue.buffer) < self.l_pre_issue.size:
-                    instruction_2 = Instruction(self.all_instructions[self.program_counter])
-                    if len(self.l_pre_issue.buffer) == self.l_pre_issue.size:
-                        return
-                    self.is_inst_dep = self.dependency_check(self.active_inst_list, instruction_2) or self.dependency_check(self.r_pre_issue.buffer, instruction_2)
-                    self.is_structural_dep = False if len(self.r_pre_issue.buffer) + len(self.l_pre_issue.buffer) <= 4 else True
-                    # self.active_inst_list.append(instruction_2)
-                    if(instruction_2.is_branch):
-                        if(self.is_inst_dep):
-                            self.wait.enqueue(instruction_2)
-                            # self.active_inst_list(instruction_2)
-                            # self.stop_fetch = True
-                        else:
-                            self.exec.enqueue(instruction_2)
-                            self.process_branch(instruction_2)
-                            # self.active_inst_list.append(instruction_2)
-                    else:
-                        self.l_pre_issue.enqueue(instruction_2)
-                        # self.active_inst_list.append(instruction_2)
-                        self.program_counter += 4
-        # if len(self.l_pre_issue.buffer) + len(self.r_pre_issue.buffer) == 4:
-        #     self.next_fetch = False
-        #     return
-        
-    def issue(self):
-        is_memory_loaded = False
-        is_store_loaded = False
-        i = 0
-        while i < len(self.r_pre_issue.buffer):
-            #shouldn't we check for r_pre_alu for structural dependency
-            self.is_structural_dep = self.structural_dependency(self.r_pre_issue.buffer[i])
-            self.is_inst_dep = self.dependency_check(self.r_pre_issue.buffer[0:i], self.r_pre_issue.buffer[i]) or self.dependency_check(self.active_inst_list, self.r_pre_issue.buffer[i])
-            if(not self.is_inst_dep and not self.is_structural_dep):
-                if(self.r_pre_issue.buffer[i].is_sw_or_lw) and not is_memory_loaded and not is_store_loaded:
-                    if(self.r_pre_issue.buffer[i].type == "sw"):
-                        is_store_loaded = True
-                        is_memory_loaded = True
-                    elif(self.r_pre_issue.buffer[i].type == "lw"):
-                        is_memory_loaded = True
-                    self.active_inst_list.append(self.r_pre_issue.buffer[i])
-                    self.l_pre_alu1.enqueue(self.r_pre_issue.arbitrary_remove(i))
-                    # i += 1
-                elif(self.r_pre_issue.buffer[i].is_arithematic):
-                    if self.process_alu2:
-                        self.process_alu2 = False
-                        self.active_inst_list.append(self.r_pre_issue.buffer[i])
-                        self.l_pre_alu2.enqueue(self.r_pre_issue.arbitrary_remove(i))
-                    else:
-                        self.process_alu2 = True
-                        i += 1
-                elif(self.r_pre_issue.buffer[i].is_logical):
-                    if self.process_alu3:
-                        self.process_alu3 = False
-                        self.active_inst_list.append(self.r_pre_issue.buffer[i])
-                        self.l_pre_alu3.enqueue(self.r_pre_issue.arbitrary_remove(i))
-                    else:
-                        self.process_alu3 = True
-                        i += 1
-                else:
-                    i += 1
-            elif(self.r_pre_issue.buffer[i].type == "sw"):
-                is_store_loaded = True
-                i += 1
-            else:
-                i += 1
-        self.process_alu2 = True if self.l_pre_alu2.is_empty() else False
-        self.process_alu3 = True if self.l_pre_alu3.is_empty() else False
-
-    def alu1(self):
-        if len(self.r_pre_alu1.buffer) > 0:
-            instruction_1 = self.r_pre_alu1.dequeue()
-            if instruction_1.type == "lw":
-                instruction_1.temp_ans = self.memory_stack[instruction_1.immediate + self.register_stack[instruction_1.source_1]]
-            elif instruction_1.type == "sw":
-                #DO that in mem function
-                pass
-            
-            if len(self.l_pre_mem.buffer) < self.l_pre_mem.size:
-                self.l_pre_mem.enqueue(instruction_1)
-        else:
-            pass
-
-    def alu2(self):
-        if len(self.r_pre_alu2.buffer) > 0:
-            instruction_2 = self.r_pre_alu2.dequeue()
-            if instruction_2.type == "add":
-                instruction_2.temp_ans = self.register_stack[instruction_2.source_1] + self.register_stack[instruction_2.source_2]
-            elif instruction_2.type == "sub":
-                instruction_2.temp_ans = self.register_stack[instruction_2.source_1] - self.register_stack[instruction_2.source_2]
-            elif instruction_2.type == "addi":
-                instruction_2.temp_ans = self.register_stack[instruction_2.source_1] + instruction_2.immediate
-
-            if len(self.l_post_alu2.buffer) < self.l_post_alu2.size:
-                 self.l_post_alu2.enqueue(instruction_2)
-        else:
-            pass
-
-    def alu3(self):
-        if len(self.r_pre_alu3.buffer) > 0:
-            instruction_3 = self.r_pre_alu3.dequeue()
-            if instruction_3.type == "and":
-                instruction_3.temp_ans = self.register_stack[instruction_3.source_1] & self.register_stack[instruction_3.source_2]
-            elif instruction_3.type == "or":
-                instruction_3.temp_ans = self.register_stack[instruction_3.source_1] | self.register_stack[instruction_3.source_2]
-            elif instruction_3.type == "andi":
-                instruction_3.temp_ans = self.register_stack[instruction_3.source_1] & instruction_3.immediate
-            elif instruction_3.type == "ori":
-                instruction_3.temp_ans = self.register_stack[instruction_3.source_1] | instruction_3.immediate
-            elif instruction_3.type == "sll":
-                instruction_3.temp_ans = self.register_stack[instruction_3.source_1] << instruction_3.immediate
-            elif instruction_3.type == "sra":
-                instruction_3.temp_ans = self.register_stack[instruction_3.source_1] >> instruction_3.immediate
-
-            if len(self.l_post_alu3.buffer) < self.l_post_alu3.size:
-                self.l_post_alu3.enqueue(instruction_3)
-        else:
-            pass
-
-    def mem(self):
-        if len(self.r_pre_mem.buffer) > 0:
-            instruction = self.r_pre_mem.dequeue()
-            if instruction.type == "sw":
-                self.memory_stack[instruction.immediate + self.register_stack[instruction.source_2]] = self.register_stack[instruction.source_1]
-                self.remove_active(instruction)
-                # self.l_post_mem.enqueue(instruction)
-            elif instruction.type == "lw":
-                self.l_post_mem.enqueue(instruction)
-            else:
-                pass
-        else:
-            pass
-        # instruction = self.r_pre_mem.dequeue()
-
-    def wb(self):
-        if len(self.r_post_mem.buffer) > 0:
-            instruction_1 = self.r_post_mem.dequeue()
-            if instruction_1.type == "lw":
-                self.register_stack[instruction_1.destination] = instruction_1.temp_ans
-                self.remove_active(instruction_1)
-        if len(self.r_post_alu2.buffer) > 0:
-            instruction_2 = self.r_post_alu2.dequeue()
-            self.register_stack[instruction_2.destination] = instruction_2.temp_ans
-            self.remove_active(instruction_2)
-        if len(self.r_post_alu3.buffer) > 0:
-            instruction_3 = self.r_post_alu3.dequeue()
-            self.register_stack[instruction_3.destination] = instruction_3.temp_ans
-            self.remove_active(instruction_3)
-        # for i in range(len(self.l_pre_issue.buffer)):
-        #     self.r_pre_issue.enqueue(self.l_pre_issue.dequeue())
-        if(len(self.l_pre_issue.buffer) != 0):
-            self.r_pre_issue.buffer.extend(self.l_pre_issue.buffer)
-            self.l_pre_issue = Buffer(4)
-        if(len(self.l_pre_alu1.buffer) > 0):
-            self.r_pre_alu1.enqueue(self.l_pre_alu1.dequeue())
-        if(len(self.l_pre_alu2.buffer) > 0):
-            self.r_pre_alu2.enqueue(self.l_pre_alu2.dequeue())
-        if(len(self.l_pre_alu3.buffer) > 0):
-            self.r_pre_alu3.enqueue(self.l_pre_alu3.dequeue())
-        if(len(self.l_pre_mem.buffer) > 0):
-            self.r_pre_mem.enqueue(self.l_pre_mem.dequeue())
-        if(len(self.l_post_alu2.buffer) > 0):
-            self.r_post_alu2.enqueue(self.l_post_alu2.dequeue())
-        if(len(self.l_post_alu3.buffer) > 0):
-            self.r_post_alu3.enqueue(self.l_post_alu3.dequeue())
-        if(len(self.l_post_mem.buffer) > 0):
-            self.r_post_mem.enqueue(self.l_post_mem.dequeue())
-
-        #To change Active status of the instructions
-        #delete that instruction from the list of all active instructions 
-
-def pipelining(processor):
-    with open('simulation.txt', 'w') as f:
-        processor.cycle = 1
-        while not processor.stop:
-            processor.fetch()
-            processor.issue()
-            processor.alu1()
-            processor.alu2()
-            processor.alu3()
-            processor.mem()
-            processor.wb()
-            processor.print_snapshot(f)
-            processor.cycle += 1
-        # processor.print_snapshot(f)
-        # print(processor.program_counter)
-
-
-
-def disassembly(processor):
-    f = open(sys.argv[1], 'r')
-    f_dis = open('disassembly.txt','w')
-    temp_break_flag = False
-    temp_instruction_counter = 256
-
-    for bin in f.readlines():
-        bin = bin.strip()
-
-        if (temp_break_flag):
-            f_dis.write(bin+"\t"+str(temp_instruction_counter)+"\t"+str(twos_complement_to_decimal(bin))+"\n")
-            processor.memory_stack[temp_instruction_counter] = twos_complement_to_decimal(bin)
-        else:
-            instruction = Instruction(bin)
-            f_dis.write(bin+"\t"+str(temp_instruction_counter)+"\t"+instruction.inst_print+"\n")
-            instruction.inst_count = temp_instruction_counter
-            processor.instruction_stack[temp_instruction_counter] = instruction.inst_print
-            if instruction.type == "break":
-                processor.break_instruction_count = temp_instruction_counter
-                temp_break_flag = True
-        # processor.all_instructions[temp_instruction_counter] = instruction
-        processor.all_instructions[temp_instruction_counter] = bin
-        temp_instruction_counter += 4
-        
-    f.close()
-    f_dis.close()
-    
-        
-if __name__=="__main__":
-    processor = Processing()
-    disassembly(processor)
-    pipelining(processor)
+import argparse
+import concurrent.futures
+import contextlib
+import copy
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+def sign_extend(value, bits):
+    sign = 1 << (bits - 1)
+    return (value ^ sign) - sign
+
+def twos_complement_to_decimal(binary_string):
+    return sign_extend(int(binary_string, 2), len(binary_string))
+
+# Low 7 bits of a word (opcode << 2 | category) ->
+# (category, type, is_branch, is_logical, is_arithematic, is_sw_or_lw)
+OPCODE_TABLE = {}
+for _category, _types in (
+        (1, ("beq", "bne", "blt", "sw")),
+        (2, ("add", "sub", "and", "or")),
+        (3, ("addi", "andi", "ori", "sll", "sra", "lw")),
+        (4, ("jal",))):
+    for _opcode, _type in enumerate(_types):
+        OPCODE_TABLE[(_opcode << 2) | (_category - 1)] = (
+            _category, _type,
+            _type in ("beq", "bne", "blt", "jal"),
+            _type in ("and", "or", "andi", "ori", "sll", "sra"),
+            _type in ("add", "sub", "addi"),
+            _type in ("sw", "lw"))
+OPCODE_TABLE[(0b11111 << 2) | 3] = (4, "break", False, False, False, False)
+
+class DecodedInstruction:
+    # Decoded once when the program is loaded and shared by every in-flight
+    # copy of the instruction, so nothing here may change after __init__.
+    __slots__ = ('binary', 'inst_count', 'category', 'type', 'source_1', 'source_2',
+                 'destination', 'immediate', '_inst_print', 'is_branch', 'is_logical',
+                 'is_arithematic', 'is_sw_or_lw')
+
+    def __init__(self, binary, inst_count=None):
+        self.binary = binary
+        self.inst_count = inst_count
+        self.decode(int(binary, 2))
+
+    def decode(self, word):
+        low = word & 0x7f
+        entry = OPCODE_TABLE.get(low)
+        if entry is None:
+            entry = ((low & 3) + 1, None, False, False, False, False)
+        (self.category, self.type, self.is_branch, self.is_logical,
+         self.is_arithematic, self.is_sw_or_lw) = entry
+        category = entry[0]
+        rd = (word >> 7) & 0x1f
+        if category == 1:
+            self.source_1 = (word >> 15) & 0x1f
+            self.source_2 = (word >> 20) & 0x1f
+            self.destination = None
+            self.immediate = ((((word >> 20) & 0xfe0) | rd) ^ 0x800) - 0x800
+        elif category == 2:
+            self.source_1 = (word >> 15) & 0x1f
+            self.source_2 = (word >> 20) & 0x1f
+            self.destination = rd
+            self.immediate = None
+        elif category == 3:
+            self.source_1 = (word >> 15) & 0x1f
+            self.source_2 = None
+            self.destination = rd
+            self.immediate = ((word >> 20) ^ 0x800) - 0x800
+        else:
+            self.source_1 = None
+            self.source_2 = None
+            self.destination = rd
+            self.immediate = ((word >> 12) ^ 0x80000) - 0x80000
+        self._inst_print = None
+
+    @property
+    def inst_print(self):
+        # Only the trace and disassembly need the text, so it is built on
+        # first use instead of for every decoded word.
+        if self._inst_print is None:
+            self._inst_print = self.format_print()
+        return self._inst_print
+
+    def format_print(self):
+        inst_type = self.type
+        if inst_type is None:
+            return None
+        if inst_type == "sw":
+            return f"sw x{self.source_1}, {self.immediate}(x{self.source_2})"
+        if inst_type == "lw":
+            return f"lw x{self.destination}, {self.immediate}(x{self.source_1})"
+        if inst_type == "jal":
+            return f"jal x{self.destination}, #{self.immediate}"
+        if inst_type == "break":
+            return "break"
+        if self.category == 1:
+            return f"{inst_type} x{self.source_1}, x{self.source_2}, #{self.immediate}"
+        if self.category == 2:
+            return f"{inst_type} x{self.destination}, x{self.source_1}, x{self.source_2}"
+        return f"{inst_type} x{self.destination}, x{self.source_1}, #{self.immediate}"
+
+class Instruction:
+    # Per-flight wrapper: the decoded fields are copied from the shared
+    # record and only the pipeline bookkeeping below is mutable.
+    __slots__ = ('decoded', 'binary', 'inst_count', 'category', 'type', 'source_1',
+                 'source_2', 'destination', 'immediate', 'is_branch', 'is_logical',
+                 'is_arithematic', 'is_sw_or_lw', 'seq', 'active', 'stop_moving',
+                 'temp_ans', 'is_first_sw', 'result_ready', 'forward_from', 'speculative',
+                 'mem_ready')
+
+    def __init__(self, decoded, seq=None):
+        self.decoded = decoded
+        self.seq = seq
+        self.binary = decoded.binary
+        self.inst_count = decoded.inst_count
+        self.category = decoded.category
+        self.type = decoded.type
+        self.source_1 = decoded.source_1
+        self.source_2 = decoded.source_2
+        self.destination = decoded.destination
+        self.immediate = decoded.immediate
+        self.is_branch = decoded.is_branch
+        self.is_logical = decoded.is_logical
+        self.is_arithematic = decoded.is_arithematic
+        self.is_sw_or_lw = decoded.is_sw_or_lw
+        self.active = False
+        self.stop_moving = False
+        self.temp_ans = None
+        self.is_first_sw = False
+        # forwarding: temp_ans may be bypassed once result_ready is set, and
+        # forward_from holds the producers of source_1/source_2 (or None)
+        self.result_ready = False
+        self.forward_from = None
+        # fetched down a predicted path; not issued until the branch resolves
+        self.speculative = False
+        # with a data cache: the cycle its MEM access completes, once started
+        self.mem_ready = None
+
+    @property
+    def inst_print(self):
+        return self.decoded.inst_print
+
+class Buffer:
+    # Fixed-capacity FIFO over a ring of slots allocated once.
+    __slots__ = ('size', 'slots', 'head', 'count')
+
+    def __init__(self, size):
+        self.size = size
+        self.slots = [None]*size
+        self.head = 0
+        self.count = 0
+
+    def enqueue(self, item):
+        if self.count < self.size:
+            self.slots[(self.head + self.count) % self.size] = item
+            self.count += 1
+        else:
+            raise Exception("Buffer full")
+
+    def dequeue(self):
+        if self.count == 0:
+            raise Exception("Buffer empty")
+        else:
+            item = self.slots[self.head]
+            self.slots[self.head] = None
+            self.head = (self.head + 1) % self.size
+            self.count -= 1
+            return item
+
+    def arbitrary_remove(self, index):
+        if index < self.count:
+            slots = self.slots
+            size = self.size
+            item = slots[(self.head + index) % size]
+            for k in range(self.head + index, self.head + self.count - 1):
+                slots[k % size] = slots[(k + 1) % size]
+            slots[(self.head + self.count - 1) % size] = None
+            self.count -= 1
+            return item
+        else:
+            raise Exception("Index out of bounds")
+
+    def __getitem__(self, index):
+        if 0 <= index < self.count:
+            return self.slots[(self.head + index) % self.size]
+        raise IndexError(index)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for k in range(self.count):
+            yield self.slots[(self.head + k) % self.size]
+
+    def is_empty(self):
+        return self.count == 0
+
+    def is_full(self):
+        return self.count == self.size
+
+class Latch:
+    # A latch between two stages. The producing stage enqueues on .left during
+    # a cycle, the consuming stage reads and dequeues on .right, and commit()
+    # at the end of the cycle hands everything on the left to the right side.
+    # Both sides live in one ring of 2*size slots, so commit only moves the
+    # boundary between them: nothing is copied or allocated.
+    __slots__ = ('size', 'left', 'right')
+
+    def __init__(self, size):
+        self.size = size
+        self.right = LatchRight(size)
+        self.left = LatchLeft(self.right)
+        self.right.left = self.left
+
+    def commit(self):
+        self.right.count += self.left.count
+        self.left.count = 0
+
+    def truncate(self, count):
+        # Drops everything after the oldest count entries, left side first.
+        right = self.right
+        left = self.left
+        for k in range(count, right.count + left.count):
+            right.slots[(right.head + k) % right.capacity] = None
+        if count < right.count:
+            right.count = count
+            left.count = 0
+        else:
+            left.count = count - right.count
+
+class LatchRight:
+    __slots__ = ('size', 'slots', 'capacity', 'head', 'count', 'left')
+
+    def __init__(self, size):
+        self.size = size
+        self.capacity = 2*size
+        self.slots = [None]*self.capacity
+        self.head = 0
+        self.count = 0
+        self.left = None
+
+    def dequeue(self):
+        if self.count == 0:
+            raise Exception("Buffer empty")
+        item = self.slots[self.head]
+        self.slots[self.head] = None
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        return item
+
+    def arbitrary_remove(self, index):
+        if index < self.count:
+            # later entries, including any already on the left side, move up
+            slots = self.slots
+            capacity = self.capacity
+            last = self.head + self.count + self.left.count - 1
+            item = slots[(self.head + index) % capacity]
+            for k in range(self.head + index, last):
+                slots[k % capacity] = slots[(k + 1) % capacity]
+            slots[last % capacity] = None
+            self.count -= 1
+            return item
+        else:
+            raise Exception("Index out of bounds")
+
+    def __getitem__(self, index):
+        if 0 <= index < self.count:
+            return self.slots[(self.head + index) % self.capacity]
+        raise IndexError(index)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for k in range(self.count):
+            yield self.slots[(self.head + k) % self.capacity]
+
+    def is_empty(self):
+        return self.count == 0
+
+    def is_full(self):
+        return self.count == self.size
+
+    def is_full_with_left(self):
+        # what is already in the latch plus what joins it this cycle
+        return self.count + self.left.count >= self.size
+
+class LatchLeft:
+    __slots__ = ('size', 'right', 'count')
+
+    def __init__(self, right):
+        self.size = right.size
+        self.right = right
+        self.count = 0
+
+    def enqueue(self, item):
+        if self.count < self.size:
+            right = self.right
+            right.slots[(right.head + right.count + self.count) % right.capacity] = item
+            self.count += 1
+        else:
+            raise Exception("Buffer full")
+
+    def __getitem__(self, index):
+        if 0 <= index < self.count:
+            right = self.right
+            return right.slots[(right.head + right.count + index) % right.capacity]
+        raise IndexError(index)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for k in range(self.count):
+            yield self[k]
+
+    def is_empty(self):
+        return self.count == 0
+
+    def is_full(self):
+        return self.count == self.size
+
+class Scoreboard:
+    # Pending writes and reads per register for a set of instructions, so the
+    # hazard question is a few list lookups instead of a scan of the set:
+    # does curr_inst read a register the set will write (RAW), write one it
+    # will write (WAW) or write one it still has to read (WAR)?
+    __slots__ = ('writes', 'reads', 'count')
+
+    def __init__(self):
+        self.writes = [0]*32
+        self.reads = [0]*32
+        self.count = 0
+
+    def add(self, inst):
+        if inst.destination is not None:
+            self.writes[inst.destination] += 1
+        if inst.source_1 is not None:
+            self.reads[inst.source_1] += 1
+        if inst.source_2 is not None:
+            self.reads[inst.source_2] += 1
+        self.count += 1
+
+    def remove(self, inst):
+        if inst.destination is not None:
+            self.writes[inst.destination] -= 1
+        if inst.source_1 is not None:
+            self.reads[inst.source_1] -= 1
+        if inst.source_2 is not None:
+            self.reads[inst.source_2] -= 1
+        self.count -= 1
+
+    def clear(self):
+        if self.count:
+            self.writes[:] = [0]*32
+            self.reads[:] = [0]*32
+            self.count = 0
+
+    def conflicts(self, curr_inst):
+        if not self.count:
+            return False
+        writes = self.writes
+        if curr_inst.source_1 is not None and writes[curr_inst.source_1]:
+            return True
+        if curr_inst.source_2 is not None and writes[curr_inst.source_2]:
+            return True
+        if curr_inst.destination is not None and (writes[curr_inst.destination] or self.reads[curr_inst.destination]):
+            return True
+        return False
+
+    def hazard(self, curr_inst):
+        # Which kind of conflict conflicts() found, checked in that order.
+        if not self.count:
+            return None
+        writes = self.writes
+        if curr_inst.source_1 is not None and writes[curr_inst.source_1]:
+            return 'raw'
+        if curr_inst.source_2 is not None and writes[curr_inst.source_2]:
+            return 'raw'
+        if curr_inst.destination is not None:
+            if writes[curr_inst.destination]:
+                return 'waw'
+            if self.reads[curr_inst.destination]:
+                return 'war'
+        return None
+
+class InFlightTracker:
+    # Issued but not yet retired instructions, keyed by the sequence number
+    # fetch gave them. Two iterations of the same loop instruction are
+    # different entries, and retiring one is a dict pop. The scoreboard is
+    # kept in step for hazard checks.
+    __slots__ = ('by_seq', 'board')
+
+    def __init__(self):
+        self.by_seq = {}
+        self.board = Scoreboard()
+
+    def append(self, inst):
+        self.by_seq[inst.seq] = inst
+        self.board.add(inst)
+
+    def retire(self, inst):
+        if self.by_seq.pop(inst.seq, None) is not None:
+            self.board.remove(inst)
+
+    def conflicts(self, curr_inst):
+        return self.board.conflicts(curr_inst)
+
+    def in_order(self):
+        # Oldest first; issue can reorder, so insertion order is not enough.
+        return [self.by_seq[seq] for seq in sorted(self.by_seq)]
+
+    def __contains__(self, inst):
+        return inst.seq in self.by_seq
+
+    def __len__(self):
+        return len(self.by_seq)
+
+    def __iter__(self):
+        return iter(self.in_order())
+
+class DataMemory:
+    # The data segment as one contiguous array of words starting at base (the
+    # word after break). Addresses are bounds and alignment checked. The Data
+    # section of the trace is cached one row of ROW words at a time, and only
+    # rows written by a store since the last render are formatted again.
+    # Words are kept in an array('q') until a store does not fit in 64 bits,
+    # then in a list, since registers hold Python ints of any size.
+    ROW = 8
+
+    # (index, value) of one word, for the digest
+    WORD = struct.Struct('<qq')
+
+    def __init__(self):
+        self.base = None
+        self.words = array('q')
+        self.rows = []
+        self.dirty_rows = set()
+        self.text = None
+        # order-independent digest of the contents, kept up to date by
+        # store() once enable_digest() has been called
+        self.digest = None
+        # indices stored to, kept by store() once enable_journal() has been
+        # called; whoever reads it clears it
+        self.journal = None
+
+    def append(self, address, value):
+        if self.base is None:
+            self.base = address
+        elif address != self.base + 4 * len(self.words):
+            raise Exception(f"Data word at {address} is not contiguous")
+        self.words.append(value)
+        self.text = None
+        if len(self.words) > len(self.rows) * self.ROW:
+            self.rows.append(None)
+        self.dirty_rows.add(len(self.rows) - 1)
+
+    def extend(self, address, values):
+        # append() for a whole segment at once; values is an array('q')
+        if self.base is None:
+            self.base = address
+        elif address != self.base + 4 * len(self.words):
+            raise Exception(f"Data word at {address} is not contiguous")
+        first_row = len(self.words) // self.ROW
+        self.words.extend(values)
+        self.text = None
+        rows = -(-len(self.words) // self.ROW)
+        self.rows.extend([None] * (rows - len(self.rows)))
+        self.dirty_rows.update(range(first_row, rows))
+
+    def __getstate__(self):
+        # the rendered rows and the digest are rebuilt after a restore
+        return {'base': self.base, 'words': self.words}
+
+    def __setstate__(self, state):
+        self.base = state['base']
+        self.words = state['words']
+        rows = -(-len(self.words) // self.ROW)
+        self.rows = [None] * rows
+        self.dirty_rows = set(range(rows))
+        self.text = None
+        self.digest = None
+        self.journal = None
+
+    def word_digest(self, index, value):
+        if -1 << 63 <= value < 1 << 63:
+            packed = self.WORD.pack(index, value)
+        else:
+            packed = self.WORD.pack(index, 0) + value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+        return (zlib.crc32(packed) << 32) | zlib.crc32(packed, 0x9e3779b9)
+
+    def enable_digest(self):
+        digest = 0
+        for index, value in enumerate(self.words):
+            digest ^= self.word_digest(index, value)
+        self.digest = digest
+
+    def enable_journal(self):
+        self.journal = []
+
+    def index(self, address):
+        offset = address - self.base if self.base is not None else -1
+        if offset < 0 or offset & 3 or offset >= 4 * len(self.words):
+            raise Exception(f"Memory address {address} out of bounds")
+        return offset >> 2
+
+    def load(self, address):
+        return self.words[self.index(address)]
+
+    def store(self, address, value):
+        index = self.index(address)
+        if self.digest is not None:
+            self.digest ^= self.word_digest(index, self.words[index]) ^ self.word_digest(index, value)
+        if self.journal is not None:
+            self.journal.append(index)
+        try:
+            self.words[index] = value
+        except OverflowError:
+            self.words = list(self.words)
+            self.words[index] = value
+        self.dirty_rows.add(index // self.ROW)
+        self.text = None
+
+    __getitem__ = load
+    __setitem__ = store
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, address):
+        return (self.base is not None and address >= self.base
+                and (address - self.base) & 3 == 0
+                and (address - self.base) >> 2 < len(self.words))
+
+    def __iter__(self):
+        return iter(range(self.base or 0, (self.base or 0) + 4 * len(self.words), 4))
+
+    def items(self):
+        return zip(self, self.words)
+
+    def render(self):
+        if self.text is None:
+            words = self.words
+            for row in self.dirty_rows:
+                start = row * self.ROW
+                self.rows[row] = f"\n{self.base + 4 * start}:" + ''.join(
+                    f"\t{value}" for value in words[start:start + self.ROW])
+            self.dirty_rows.clear()
+            self.text = ''.join(self.rows)
+        return self.text
+
+class PipelineConfig:
+    # Shape of the modelled pipeline. The defaults are the original machine:
+    # a 4-entry pre-issue queue, 2-entry pre-ALU1 queue, one-entry latches
+    # elsewhere, two instructions fetched per cycle and one unit per class
+    # (ALU1 address/MEM, ALU2 arithmetic, ALU3 logical). issue_width=None
+    # leaves issue limited only by the per-class rules. forwarding turns on
+    # the bypass network from the post-ALU/MEM latches. predictor is one of
+    # BranchPredictor.KINDS, with predictor_entries table entries. Setting
+    # cache_sets puts a DataCache in front of data memory; see there for the
+    # other cache_ fields.
+    FIELDS = ('pre_issue_size', 'pre_alu1_size', 'pre_alu2_size', 'post_alu2_size',
+              'pre_alu3_size', 'post_alu3_size', 'pre_mem_size', 'post_mem_size',
+              'fetch_width', 'issue_width', 'alu1_units', 'alu2_units', 'alu3_units',
+              'forwarding', 'predictor', 'predictor_entries', 'cache_sets', 'cache_ways',
+              'cache_line', 'cache_policy', 'cache_write', 'cache_hit_latency',
+              'cache_miss_penalty')
+    CHOICES = {'cache_policy': ('lru', 'fifo'), 'cache_write': ('back', 'through')}
+    # the integer fields that may be None ("none" on the command line)
+    OPTIONAL = ('issue_width', 'cache_sets')
+
+    def __init__(self, **kwargs):
+        self.pre_issue_size = 4
+        self.pre_alu1_size = 2
+        self.pre_alu2_size = 1
+        self.post_alu2_size = 1
+        self.pre_alu3_size = 1
+        self.post_alu3_size = 1
+        self.pre_mem_size = 1
+        self.post_mem_size = 1
+        self.fetch_width = 2
+        self.issue_width = None
+        self.alu1_units = 1
+        self.alu2_units = 1
+        self.alu3_units = 1
+        self.forwarding = False
+        self.predictor = 'none'
+        self.predictor_entries = 64
+        self.cache_sets = None
+        self.cache_ways = 2
+        self.cache_line = 16
+        self.cache_policy = 'lru'
+        self.cache_write = 'back'
+        self.cache_hit_latency = 1
+        self.cache_miss_penalty = 10
+        for name, value in kwargs.items():
+            if name not in self.FIELDS:
+                raise Exception(f"Unknown pipeline parameter {name}")
+            if name == 'forwarding':
+                value = bool(value)
+            elif name == 'predictor':
+                value = 'none' if value is None else value
+                if value not in BranchPredictor.KINDS:
+                    raise Exception(f"Pipeline parameter predictor must be one of {', '.join(BranchPredictor.KINDS)}")
+            elif name in self.CHOICES:
+                if value not in self.CHOICES[name]:
+                    raise Exception(f"Pipeline parameter {name} must be one of {', '.join(self.CHOICES[name])}")
+            elif value is None:
+                if name not in self.OPTIONAL:
+                    raise Exception(f"Pipeline parameter {name} must be a positive integer")
+            elif not isinstance(value, int) or value < 1:
+                raise Exception(f"Pipeline parameter {name} must be a positive integer")
+            setattr(self, name, value)
+
+    def describe(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+class DataCache:
+    # Timing model of a data cache in front of DataMemory: it tracks which
+    # lines are present, never the data, so values still come straight from
+    # memory_stack and only the MEM stage latency changes. cache_sets sets of
+    # cache_ways lines of cache_line bytes, replaced in LRU or FIFO order.
+    #   write back    - stores allocate and dirty the line; evicting a dirty
+    #                   line writes it back first
+    #   write through - every store also writes memory; a store miss does
+    #                   not allocate
+    # An access takes cache_hit_latency cycles, plus cache_miss_penalty for
+    # each line moved to or from memory.
+    def __init__(self, config):
+        self.sets = config.cache_sets
+        self.ways = config.cache_ways
+        self.line = config.cache_line
+        self.lru = config.cache_policy == 'lru'
+        self.write_back = config.cache_write == 'back'
+        self.hit_latency = config.cache_hit_latency
+        self.miss_penalty = config.cache_miss_penalty
+        # per set: tag -> dirty, oldest (or least recently used) first
+        self.lines = [{} for _ in range(self.sets)]
+        self.reads = 0
+        self.read_hits = 0
+        self.writes = 0
+        self.write_hits = 0
+        self.evictions = 0
+        self.writebacks = 0
+        self.memory_writes = 0
+        self.stall_cycles = 0
+
+    def access(self, address, write):
+        # Returns the latency in cycles.
+        block = address // self.line
+        lines = self.lines[block % self.sets]
+        tag = block // self.sets
+        hit = tag in lines
+        latency = self.hit_latency
+        if write:
+            self.writes += 1
+            self.write_hits += hit
+        else:
+            self.reads += 1
+            self.read_hits += hit
+        if hit:
+            if self.lru:
+                lines[tag] = lines.pop(tag)
+        elif self.write_back or not write:
+            latency += self.miss_penalty
+            if len(lines) == self.ways:
+                victim = next(iter(lines))
+                if lines.pop(victim):
+                    self.writebacks += 1
+                    latency += self.miss_penalty
+                self.evictions += 1
+            lines[tag] = False
+        if write:
+            if self.write_back:
+                lines[tag] = True
+            else:
+                self.memory_writes += 1
+                latency += self.miss_penalty
+        self.stall_cycles += latency - 1
+        return latency
+
+    def report(self):
+        accesses = self.reads + self.writes
+        hits = self.read_hits + self.write_hits
+        return {'sets': self.sets,
+                'ways': self.ways,
+                'line_bytes': self.line,
+                'policy': 'lru' if self.lru else 'fifo',
+                'write': 'back' if self.write_back else 'through',
+                'reads': self.reads,
+                'read_hits': self.read_hits,
+                'writes': self.writes,
+                'write_hits': self.write_hits,
+                'hit_rate': hits/accesses if accesses else 0.0,
+                'evictions': self.evictions,
+                'writebacks': self.writebacks,
+                'memory_writes': self.memory_writes,
+                'mem_stall_cycles': self.stall_cycles}
+
+class BranchPredictor:
+    # Predicts the next PC of a branch that has to wait in the IF unit for
+    # its operands, so fetch can carry on down that path meanwhile.
+    #   taken / not-taken - static
+    #   2bit              - saturating counters indexed by PC, untagged
+    #   btb               - direct-mapped table tagged by PC holding the
+    #                       target and a 2-bit counter; a miss is not-taken
+    # jal is always predicted to its target, which fetch decodes anyway.
+    # Every branch resolved in fetch trains the tables; the counters only
+    # cover the branches that were predicted.
+    KINDS = ('none', 'taken', 'not-taken', '2bit', 'btb')
+
+    def __init__(self, kind, entries):
+        self.kind = kind
+        self.entries = entries
+        self.counters = [1]*entries
+        self.tags = [None]*entries
+        self.targets = [None]*entries
+        self.predictions = 0
+        self.correct = 0
+        self.squashed = 0
+        # fetch cycles spent waiting on a branch: down the wrong path, and
+        # down the right one (what a stalled IF unit would have lost)
+        self.penalty_cycles = 0
+        self.covered_cycles = 0
+
+    def predict(self, inst, address):
+        target = address + inst.immediate*2
+        if inst.type == 'jal' or self.kind == 'taken':
+            return target
+        if self.kind == 'not-taken':
+            return address + 4
+        index = (address >> 2) % self.entries
+        if self.kind == 'btb':
+            if self.tags[index] != address:
+                return address + 4
+            target = self.targets[index]
+        return target if self.counters[index] >= 2 else address + 4
+
+    def update(self, inst, address, next_pc):
+        if inst.type == 'jal' or self.kind in ('taken', 'not-taken'):
+            return
+        taken = next_pc != address + 4
+        index = (address >> 2) % self.entries
+        counters = self.counters
+        if self.kind == 'btb' and self.tags[index] != address:
+            if not taken:
+                return
+            self.tags[index] = address
+            counters[index] = 1
+        if taken:
+            if self.kind == 'btb':
+                self.targets[index] = next_pc
+            counters[index] = min(counters[index] + 1, 3)
+        else:
+            counters[index] = max(counters[index] - 1, 0)
+
+    def resolved(self, correct, cycles, squashed):
+        self.predictions += 1
+        if correct:
+            self.correct += 1
+            self.covered_cycles += cycles
+        else:
+            self.penalty_cycles += cycles
+            self.squashed += squashed
+
+    def report(self):
+        mispredicts = self.predictions - self.correct
+        return {'predictor': self.kind,
+                'entries': self.entries,
+                'predictions': self.predictions,
+                'correct': self.correct,
+                'mispredicts': mispredicts,
+                'accuracy': self.correct/self.predictions if self.predictions else 0.0,
+                'squashed_instructions': self.squashed,
+                'mispredict_penalty_cycles': self.penalty_cycles,
+                'mean_mispredict_penalty': self.penalty_cycles/mispredicts if mispredicts else 0.0,
+                'covered_wait_cycles': self.covered_cycles}
+
+class PerfCounters:
+    # Counters for the simulated machine, kept when Processing.stats is set.
+    # Fetch stalls are counted in cycles; issue stalls in instruction-cycles,
+    # one for every pre-issue entry left behind, under the first thing that
+    # blocked it. Queue occupancy is sampled at the end of every cycle.
+    FETCH_STALLS = ('branch_wait', 'pre_issue_full')
+    ISSUE_STALLS = ('raw', 'waw', 'war', 'structural', 'memory_order')
+
+    def __init__(self, processor):
+        self.cycles = 0
+        self.instructions = 0
+        self.stalls = dict.fromkeys(self.FETCH_STALLS + self.ISSUE_STALLS, 0)
+        # this cycle's stalls, repeated for idle cycles skipped after it
+        self.cycle_stalls = {}
+        self.last_stalls = {}
+        self.opcodes = {}
+        self.occupancy = {title: [0]*(size + 1) for title, size, queue in processor.snapshot_queues()}
+        # the BranchPredictor and DataCache keep their own counters
+        self.predictor = processor.predictor
+        self.cache = processor.cache
+
+    def stall(self, kind, count=1):
+        self.cycle_stalls[kind] = self.cycle_stalls.get(kind, 0) + count
+
+    def retired(self, inst):
+        self.instructions += 1
+        self.opcodes[inst.type] = self.opcodes.get(inst.type, 0) + 1
+
+    def end_cycle(self, processor, repeat=1):
+        stalls = self.stalls
+        for kind, count in self.cycle_stalls.items():
+            stalls[kind] += count*repeat
+        for title, size, queue in processor.snapshot_queues():
+            self.occupancy[title][queue.count] += repeat
+        self.cycles += repeat
+        self.last_stalls = self.cycle_stalls
+        self.cycle_stalls = {}
+
+    def skip(self, processor, cycles):
+        # Skipped idle cycles repeat the state and stalls of the cycle before.
+        self.cycle_stalls = self.last_stalls
+        self.end_cycle(processor, cycles)
+
+    def report(self):
+        occupancy = {}
+        for title, histogram in self.occupancy.items():
+            samples = sum(histogram)
+            occupancy[title] = {'histogram': histogram,
+                                'mean': sum(n*c for n, c in enumerate(histogram))/samples if samples else 0.0}
+        report = {'cycles': self.cycles,
+                  'instructions_retired': self.instructions,
+                  'ipc': self.instructions/self.cycles if self.cycles else 0.0,
+                  'fetch_stall_cycles': {kind: self.stalls[kind] for kind in self.FETCH_STALLS},
+                  'issue_stalls': {kind: self.stalls[kind] for kind in self.ISSUE_STALLS},
+                  'opcodes': dict(sorted(self.opcodes.items())),
+                  'occupancy': occupancy}
+        if self.predictor is not None:
+            report['branch_prediction'] = self.predictor.report()
+        if self.cache is not None:
+            report['cache'] = self.cache.report()
+        return report
+
+    def write_json(self, f):
+        json.dump(self.report(), f, indent=2)
+        f.write('\n')
+
+    def write_csv(self, f):
+        # one metric,key,value row per number
+        report = self.report()
+        writer = csv.writer(f)
+        writer.writerow(['metric', 'key', 'value'])
+        for name in ('cycles', 'instructions_retired', 'ipc'):
+            writer.writerow([name, '', report[name]])
+        for section in ('fetch_stall_cycles', 'issue_stalls', 'opcodes', 'branch_prediction', 'cache'):
+            for key, value in report.get(section, {}).items():
+                writer.writerow([section, key, value])
+        for title, queue in report['occupancy'].items():
+            for entries, cycles in enumerate(queue['histogram']):
+                writer.writerow(['occupancy', f'{title}={entries}', cycles])
+            writer.writerow(['occupancy_mean', title, queue['mean']])
+
+class Processing:
+    def __init__(self, config=None):
+        self.config = config if config is not None else PipelineConfig()
+        # PerfCounters when counters were asked for; None keeps them off
+        self.stats = None
+        self.memory_stack = DataMemory()
+        self.instruction_stack = {}
+        self.register_stack = [0]*32
+        self.program_end = None
+        self.all_instructions = {}
+        self.decoded_program = {}
+        self.program_counter = 256
+        self.break_instruction_count = 0
+        self.stop_fetch = False
+        self.is_inst_dep = False
+        self.is_structural_dep = False
+        self.active_inst_list = InFlightTracker()
+        self.next_seq = 0
+        # Scoreboards for r_pre_issue and, during issue(), the pre-issue
+        # entries that were passed over this cycle.
+        self.pre_issue_board = Scoreboard()
+        self.skipped_board = Scoreboard()
+        self.fetch_group_board = Scoreboard()
+        # forwarding: the last issued writer of each register
+        self.producers = [None]*32
+        # branch prediction: None for a stalling IF unit. While the branch in
+        # the wait slot is predicted, fetch_pc is where fetch carries on down
+        # the predicted path, predicted_pc that path's start and speculated
+        # the number of pre-issue entries fetched along it.
+        if self.config.predictor != 'none':
+            self.predictor = BranchPredictor(self.config.predictor, self.config.predictor_entries)
+        else:
+            self.predictor = None
+        self.predicted_pc = None
+        self.predicted_at = None
+        self.speculated = 0
+        self.cache = DataCache(self.config) if self.config.cache_sets is not None else None
+        self.cycle = 1
+        self.stop = False
+        self.next_fetch = True
+        self.instructions_retired = 0
+        # Stages bump moves whenever they change pipeline state. A cycle that
+        # leaves it unchanged can only be followed by identical cycles until
+        # some stage's wakeup cycle (a heap, see schedule_wakeup) comes round.
+        self.moves = 0
+        self.wakeups = []
+        
+        self.pre_issue = Latch(self.config.pre_issue_size)
+        self.l_pre_issue = self.pre_issue.left
+        self.r_pre_issue = self.pre_issue.right
+
+        self.pre_alu1 = Latch(self.config.pre_alu1_size)
+        self.l_pre_alu1 = self.pre_alu1.left
+        self.r_pre_alu1 = self.pre_alu1.right
+
+        self.pre_alu2 = Latch(self.config.pre_alu2_size)
+        self.l_pre_alu2 = self.pre_alu2.left
+        self.r_pre_alu2 = self.pre_alu2.right
+        self.post_alu2 = Latch(self.config.post_alu2_size)
+        self.l_post_alu2 = self.post_alu2.left
+        self.r_post_alu2 = self.post_alu2.right
+
+        self.pre_alu3 = Latch(self.config.pre_alu3_size)
+        self.l_pre_alu3 = self.pre_alu3.left
+        self.r_pre_alu3 = self.pre_alu3.right
+        self.post_alu3 = Latch(self.config.post_alu3_size)
+        self.l_post_alu3 = self.post_alu3.left
+        self.r_post_alu3 = self.post_alu3.right
+
+        self.pre_mem = Latch(self.config.pre_mem_size)
+        self.l_pre_mem = self.pre_mem.left
+        self.r_pre_mem = self.pre_mem.right
+        self.post_mem = Latch(self.config.post_mem_size)
+        self.l_post_mem = self.post_mem.left
+        self.r_post_mem = self.post_mem.right
+
+        self.latches = (self.pre_issue, self.pre_alu1, self.pre_alu2, self.post_alu2,
+                        self.pre_alu3, self.post_alu3, self.pre_mem, self.post_mem)
+
+        self.exec = Buffer(1)
+        self.wait = Buffer(1)
+
+    def __getstate__(self):
+        # For checkpoints: the machine state only, without any profiler
+        # wrappers installed on this instance.
+        state = self.__dict__.copy()
+        for name in HostProfiler.PROCESSING_METHODS:
+            state.pop(name, None)
+        return state
+    
+
+    # def dependency_check(self, inst_list, curr_inst):
+    #     for i in inst_list:
+    #         #RAW
+    #         if(curr_inst.source_1 != None and curr_inst.source_1 == i.destination):
+    #             return True
+    #         if(curr_inst.source_2 != None and curr_inst.source_2 == i.destinatoion):
+    #             return True
+    #         #Pre issue is full
+    #         if(len(self.pre_issue)==self.pre_issue.size):
+    #             return True
+
+    def dependency_check(self, curr_inst):
+        # Hazards against everything issued but not retired and everything
+        # already waiting in the pre-issue queue.
+        if self.config.forwarding and curr_inst.is_branch:
+            return self.forwarding_conflicts(curr_inst, False) or self.pre_issue_board.conflicts(curr_inst)
+        return self.active_inst_list.conflicts(curr_inst) or self.pre_issue_board.conflicts(curr_inst)
+
+    def can_forward(self, producer, issuing):
+        # Will producer's result be on the bypass when it is needed: now, for
+        # a branch resolving in fetch, or next cycle, for an instruction
+        # being issued? Results are bypassed from the post-ALU2/ALU3/MEM
+        # latches, so a producer about to enter one also qualifies.
+        if producer.result_ready:
+            return True
+        if not issuing:
+            return False
+        if producer.type == "lw":
+            return producer in self.r_pre_mem
+        return producer in self.r_pre_alu2 or producer in self.r_pre_alu3
+
+    def forwarding_conflicts(self, curr_inst, issuing):
+        # active_inst_list.conflicts() with RAW hazards on bypassable results
+        # allowed; the producers are noted in curr_inst.forward_from.
+        board = self.active_inst_list.board
+        curr_inst.forward_from = None
+        if not board.count:
+            return False
+        destination = curr_inst.destination
+        if destination is not None and (board.writes[destination] or board.reads[destination]):
+            return True
+        forward = None
+        for k, source in enumerate((curr_inst.source_1, curr_inst.source_2)):
+            if source is not None and board.writes[source]:
+                producer = self.producers[source]
+                if not self.can_forward(producer, issuing):
+                    return True
+                if forward is None:
+                    forward = [None, None]
+                forward[k] = producer
+        curr_inst.forward_from = forward
+        return False
+
+    def operands_ready(self, inst):
+        forward = inst.forward_from
+        return forward is None or all(producer is None or producer.result_ready for producer in forward)
+
+    def operands(self, inst):
+        # source_1 and source_2 values, bypassed from their producers where
+        # the registers have not been written back yet
+        registers = self.register_stack
+        source_1 = registers[inst.source_1] if inst.source_1 is not None else None
+        source_2 = registers[inst.source_2] if inst.source_2 is not None else None
+        forward = getattr(inst, 'forward_from', None)
+        if forward is not None:
+            if forward[0] is not None:
+                source_1 = forward[0].temp_ans
+            if forward[1] is not None:
+                source_2 = forward[1].temp_ans
+        return source_1, source_2
+
+    def structural_dependency(self, curr_inst):
+        if(curr_inst.is_logical and self.r_pre_alu3.is_full_with_left()):
+            return True
+        elif(curr_inst.is_arithematic and self.r_pre_alu2.is_full_with_left()):
+            return True
+        elif(curr_inst.is_sw_or_lw and self.r_pre_alu1.is_full_with_left()):
+            return True
+        return False
+    
+    def retire(self, inst):
+        self.instructions_retired += 1
+        if self.stats is not None:
+            self.stats.retired(inst)
+
+    def issue_stall_cause(self, inst, is_store_loaded):
+        if self.is_inst_dep:
+            kinds = (self.skipped_board.hazard(inst), self.active_inst_list.board.hazard(inst))
+            for kind in ('raw', 'waw', 'war'):
+                if kind in kinds:
+                    return kind
+        if inst.is_sw_or_lw and is_store_loaded and not self.is_structural_dep:
+            return 'memory_order'
+        return 'structural'
+
+    def process_branch(self, instruction_1):
+        self.retire(instruction_1)
+        address = self.program_counter
+        source_1, source_2 = self.operands(instruction_1)
+        if(instruction_1.type == 'jal'):
+            self.register_stack[instruction_1.destination] = self.program_counter + 4
+            self.program_counter += instruction_1.immediate * 2
+        elif(instruction_1.type == 'beq'):
+            if(source_1 == source_2):
+                self.program_counter += (instruction_1.immediate * 2)
+            else:
+                self.program_counter += 4
+        elif(instruction_1.type == 'bne'):
+            if(source_1 != source_2):
+                self.program_counter += (instruction_1.immediate * 2)
+            else:
+                self.program_counter += 4
+        elif(instruction_1.type == 'blt'):
+            if(source_1 < source_2):
+                self.program_counter += (instruction_1.immediate * 2)
+            else:
+                self.program_counter += 4
+        if self.predictor is not None:
+            self.predictor.update(instruction_1, address, self.program_counter)
+
+    def schedule_wakeup(self, cycle):
+        # Called by a stage that is waiting on a fixed latency and will be able
+        # to make progress again in the given cycle.
+        heapq.heappush(self.wakeups, cycle)
+
+    def next_wakeup(self):
+        while self.wakeups and self.wakeups[0] <= self.cycle:
+            heapq.heappop(self.wakeups)
+        return self.wakeups[0] if self.wakeups else None
+
+    def decoded_at(self, address):
+        # Code words are decoded by disassembly(); anything else (e.g. a data
+        # word reached by a wild branch) is decoded on first use and kept.
+        decoded = self.decoded_program.get(address)
+        if decoded is None:
+            decoded = DecodedInstruction(self.all_instructions[address], address)
+            self.decoded_program[address] = decoded
+        return decoded
+
+    def decode_at(self, address):
+        self.next_seq += 1
+        return Instruction(self.decoded_at(address), self.next_seq)
+
+    def remove_active(self, inst):
+        self.active_inst_list.retire(inst)
+    
+    def registers_text(self):
+        parts = ["Registers"]
+        registers = self.register_stack
+        for i in range(0, 32, 8):
+            parts.append(f"\nx{i:02d}:")
+            for value in registers[i:i + 8]:
+                parts.append(f"\t{value}")
+        parts.append("\nData")
+        parts.append(self.memory_stack.render())
+        if(not self.stop):
+            parts.append('\n')
+        return ''.join(parts)
+
+    def display_cycle_registers(self, f_sim):
+        f_sim.write(self.registers_text())
+
+    def snapshot_queues(self):
+        # The queues print_snapshot shows, in order, as (title, slots, buffer).
+        # One-slot queues are printed on a single line.
+        return (('Pre-Issue Queue', self.r_pre_issue.size, self.r_pre_issue),
+                ('Pre-ALU1 Queue', self.r_pre_alu1.size, self.r_pre_alu1),
+                ('Pre-MEM Queue', self.r_pre_mem.size, self.r_pre_mem),
+                ('Post-MEM Queue', self.r_post_mem.size, self.r_post_mem),
+                ('Pre-ALU2 Queue', self.r_pre_alu2.size, self.r_pre_alu2),
+                ('Post-ALU2 Queue', self.r_post_alu2.size, self.r_post_alu2),
+                ('Pre-ALU3 Queue', self.r_pre_alu3.size, self.r_pre_alu3),
+                ('Post-ALU3 Queue', self.r_post_alu3.size, self.r_post_alu3))
+
+    def bypass_entries(self):
+        # Results on the bypass network this cycle, as shown in the snapshot.
+        return [f"x{inst.destination} = {inst.temp_ans} [{inst.inst_print}]"
+                for latch in (self.r_post_mem, self.r_post_alu2, self.r_post_alu3)
+                for inst in latch if inst.result_ready]
+
+    def snapshot_slots(self):
+        # Flat (label, shown instruction) view of the same state, used to
+        # find what changed between two cycles.
+        slots = [('Waiting', self.wait[0].inst_print if self.wait.count else ''),
+                 ('Executed', self.exec[0].inst_print if self.exec.count else '')]
+        for title, size, queue in self.snapshot_queues():
+            buffer = queue
+            if size == 1:
+                slots.append((title, buffer[0].inst_print if buffer else ''))
+            else:
+                for i in range(size):
+                    slots.append((f'{title} Entry {i}', buffer[i].inst_print if i < len(buffer) else ''))
+        if self.config.forwarding:
+            slots.append(('Bypass', ', '.join(self.bypass_entries())))
+        return slots
+
+    def snapshot_text(self):
+        parts = ['-'*20, '\n', f'Cycle {self.cycle}:\n\n', 'IF Unit:\n']
+        if self.wait.count != 0:
+            parts.append(f'\tWaiting: [{self.wait[0].inst_print}]\n')
+        else:
+            parts.append('\tWaiting:\n')
+        if self.exec.count == 0:
+            parts.append('\tExecuted:\n')
+        else:
+            parts.append(f'\tExecuted: [{self.exec[0].inst_print}]\n')
+        for title, size, queue in self.snapshot_queues():
+            buffer = queue
+            if size == 1:
+                if len(buffer) == 0:
+                    parts.append(f'{title}:\n')
+                else:
+                    parts.append(f'{title}: [{buffer[0].inst_print}]\n')
+            else:
+                parts.append(f'{title}:\n')
+                for i in range(size):
+                    if i < len(buffer):
+                        parts.append(f'\tEntry {i}: [{buffer[i].inst_print}]\n')
+                    else:
+                        parts.append(f'\tEntry {i}:\n')
+        if self.config.forwarding:
+            parts.append('Bypass:\n')
+            for entry in self.bypass_entries():
+                parts.append(f'\t{entry}\n')
+        parts.append('\n')
+        parts.append(self.registers_text())
+        return ''.join(parts)
+
+    def print_snapshot(self,f):
+        f.write(self.snapshot_text())
+
+    def run_cycles(self, until=None, checkpoint_every=None, checkpoint_dir='checkpoints',
+                   max_cycles=None, last_cycle=None):
+        # The cycle loop, from self.cycle on. Yields after the stages of each
+        # cycle with its state in place; the value is the number of idle
+        # cycles that follow (nothing moved, so nothing can until the next
+        # wakeup), which are skipped. Ends after the cycle that retires
+        # break, or once until instructions have retired or last_cycle has
+        # run, ready to go on from the next cycle. A checkpoint is saved
+        # every checkpoint_every cycles, and a run still going after
+        # max_cycles is an error.
+        every = checkpoint_every
+        if every:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            next_checkpoint = (self.cycle - 1) // every * every + every + 1
+        while True:
+            if every and self.cycle >= next_checkpoint:
+                save_checkpoint(self, checkpoint_path(checkpoint_dir, self.cycle))
+                next_checkpoint = (self.cycle - 1) // every * every + every + 1
+            moves = self.moves
+            self.fetch()
+            self.issue()
+            self.alu1()
+            self.alu2()
+            self.alu3()
+            self.mem()
+            self.wb()
+            idle = 0
+            if not self.stop and self.moves == moves:
+                wakeup = self.next_wakeup()
+                if wakeup is None:
+                    yield 0
+                    raise Exception(f"Pipeline deadlocked at cycle {self.cycle}")
+                if wakeup > self.cycle + 1:
+                    idle = wakeup - 1 - self.cycle
+            yield idle
+            if self.stop:
+                return
+            self.cycle += idle + 1
+            if until is not None and self.instructions_retired >= until:
+                return
+            if last_cycle is not None and self.cycle > last_cycle:
+                return
+            if max_cycles is not None and self.cycle > max_cycles:
+                raise Exception(f"No break after {max_cycles} cycles")
+
+    def cycles(self, until=None):
+        # Streaming view of a run of the loaded program: a CycleRecord per
+        # simulated cycle, built only from the live state, never from the
+        # text trace. The pipeline advances only when the next record is
+        # asked for, so a slow consumer simply holds the simulation.
+        recorder = CycleRecorder(self)
+        for idle in self.run_cycles(until):
+            yield recorder.capture(idle)
+
+    def fetch(self):
+        #Attempt 3s
+        # if self.next_fetch == False:
+        #     self.next_fetch = True
+        #     return
+        if self.predictor is not None and self.wait.count:
+            self.fetch_predicted()
+            return
+        instruction_1 = self.decode_at(self.program_counter)
+        # self.program_counter += 4
+        if self.l_pre_issue.count + self.r_pre_issue.count < self.l_pre_issue.size:
+            if(self.exec.count == 1):
+                    inst = self.exec.dequeue()
+                    self.moves += 1
+                    # self.remove_active(inst)
+            if instruction_1.type == "break" and self.exec.count == 0 and self.wait.count == 0:
+                self.exec.enqueue(instruction_1)
+                # self.program_counter += 4
+                self.retire(instruction_1)
+                self.stop = True
+                return
+            if(self.wait.count) == 1: # already an instruction is waititg and now is dependency free
+                if not self.dependency_check(self.wait[0]):
+                    instruction_1 = self.wait.dequeue()
+                    self.exec.enqueue(instruction_1)
+                    self.process_branch(instruction_1)
+                    self.moves += 1
+                    # self.stop_fetch = True
+                elif self.stats is not None:
+                    self.stats.stall('branch_wait')
+                return
+            self.is_inst_dep = self.dependency_check(instruction_1)
+            self.is_structural_dep = False if self.r_pre_issue.count + self.l_pre_issue.count + self.exec.count + self.wait.count < self.l_pre_issue.size else True
+            self.moves += 1
+            # self.active_inst_list.append(instruction_1)
+            if(instruction_1.is_branch):
+                if(self.is_inst_dep):
+                    self.wait.enqueue(instruction_1)
+                    if self.predictor is not None:
+                        self.predict(instruction_1)
+                    # self.active_inst_list.append(instruction_1)
+                    # self.stop_fetch = True
+                else:
+                    self.exec.enqueue(instruction_1)
+                    self.process_branch(instruction_1)
+                    # self.active_inst_list.append(instruction_1)
+            else:
+                self.l_pre_issue.enqueue(instruction_1)
+                # self.active_inst_list.append(instruction_1)
+                self.program_counter += 4
+                # the rest of the fetch group stops after a branch; slots past
+                # the second also check the instructions fetched alongside them
+                group = self.fetch_group_board
+                group.clear()
+                group.add(instruction_1)
+                for slot in range(1, self.config.fetch_width):
+                    if self.l_pre_issue.count + self.r_pre_issue.count >= self.l_pre_issue.size:
+                        break
+                    instruction_2 = self.decode_at(self.program_counter)
+                    if self.l_pre_issue.count == self.l_pre_issue.size:
+                        return
+                    self.is_inst_dep = self.dependency_check(instruction_2) or (slot > 1 and group.conflicts(instruction_2))
+                    self.is_structural_dep = False if self.r_pre_issue.count + self.l_pre_issue.count <= self.l_pre_issue.size else True
+                    # self.active_inst_list.append(instruction_2)
+                    if(instruction_2.is_branch):
+                        if(self.is_inst_dep):
+                            self.wait.enqueue(instruction_2)
+                            if self.predictor is not None:
+                                self.predict(instruction_2)
+                            # self.active_inst_list(instruction_2)
+                            # self.stop_fetch = True
+                        else:
+                            self.exec.enqueue(instruction_2)
+                            self.process_branch(instruction_2)
+                            # self.active_inst_list.append(instruction_2)
+                        break
+                    else:
+                        self.l_pre_issue.enqueue(instruction_2)
+                        # self.active_inst_list.append(instruction_2)
+                        group.add(instruction_2)
+                        self.program_counter += 4
+        elif self.stats is not None:
+            self.stats.stall('pre_issue_full')
+        # if len(self.l_pre_issue.buffer) + len(self.r_pre_issue.buffer) == 4:
+        #     self.next_fetch = False
+        #     return
+
+    def predict(self, branch):
+        # The branch has to wait for its operands: fetch carries on from
+        # the predicted PC from the next cycle on.
+        self.predicted_pc = self.predictor.predict(branch, self.program_counter)
+        self.predicted_at = self.cycle
+        self.speculated = 0
+        self.program_counter = self.predicted_pc
+
+    def fetch_predicted(self):
+        # IF unit with a predicted branch in the wait slot: resolve it once
+        # its operands are there, otherwise fetch down the predicted path.
+        if self.exec.count == 1:
+            self.exec.dequeue()
+            self.moves += 1
+        branch = self.wait[0]
+        if self.dependency_check(branch):
+            if not self.fetch_speculative() and self.stats is not None:
+                self.stats.stall('branch_wait')
+            return
+        self.wait.dequeue()
+        self.exec.enqueue(branch)
+        self.moves += 1
+        fetch_pc = self.program_counter
+        self.program_counter = branch.inst_count
+        self.process_branch(branch)
+        correct = self.program_counter == self.predicted_pc
+        self.predictor.resolved(correct, self.cycle - self.predicted_at, self.speculated)
+        if correct:
+            # the predicted path becomes the real one
+            self.program_counter = fetch_pc
+            for inst in self.r_pre_issue:
+                if inst.speculative:
+                    inst.speculative = False
+                    self.pre_issue_board.add(inst)
+        else:
+            self.pre_issue.truncate(self.r_pre_issue.count + self.l_pre_issue.count - self.speculated)
+        self.speculated = 0
+        self.predicted_pc = None
+
+    def fetch_speculative(self):
+        # Fetches along the predicted path into the pre-issue queue; returns
+        # whether anything was fetched. Only one branch is predicted at a
+        # time, so a second one (or a break) ends the path for now.
+        fetched = False
+        for slot in range(self.config.fetch_width):
+            if self.l_pre_issue.count + self.r_pre_issue.count >= self.l_pre_issue.size:
+                break
+            if self.program_counter not in self.all_instructions:
+                break
+            inst = self.decode_at(self.program_counter)
+            if inst.is_branch or inst.type is None or inst.type == "break":
+                break
+            inst.speculative = True
+            self.l_pre_issue.enqueue(inst)
+            self.program_counter += 4
+            self.speculated += 1
+            self.moves += 1
+            fetched = True
+        return fetched
+
+    def issue(self):
+        memory_issued = 0
+        is_store_loaded = False
+        # with forwarding a store can be ready before an older load, and with
+        # a cache loads read memory late, in MEM; either way the load must
+        # still read memory first. The other way round, a held sw keeps every
+        # later memory op back, so pre-ALU1 and pre-MEM stay in program order
+        # for a cache to rely on
+        is_load_waiting = False
+        loads_in_order = self.config.forwarding or self.cache is not None
+        issued_count = 0
+        skipped = self.skipped_board
+        skipped.clear()
+        forwarding = self.config.forwarding
+        buffer = self.r_pre_issue
+        i = 0
+        while i < buffer.count:
+            if self.config.issue_width is not None and issued_count == self.config.issue_width:
+                if self.stats is not None:
+                    self.stats.stall('structural', buffer.count - i)
+                break
+            inst = buffer[i]
+            if inst.speculative:
+                # everything from here on is down a predicted path
+                break
+            issued = None
+            #shouldn't we check for r_pre_alu for structural dependency
+            self.is_structural_dep = self.structural_dependency(inst)
+            if forwarding:
+                self.is_inst_dep = skipped.conflicts(inst) or self.forwarding_conflicts(inst, True)
+            else:
+                self.is_inst_dep = skipped.conflicts(inst) or self.active_inst_list.conflicts(inst)
+            memory_blocked = is_store_loaded or (is_load_waiting and inst.type == "sw")
+            if(not self.is_inst_dep and not self.is_structural_dep):
+                # one memory op per ALU1 unit per cycle, and nothing after a sw
+                if(inst.is_sw_or_lw) and memory_issued < self.config.alu1_units and not memory_blocked:
+                    if not self.l_pre_alu1.is_full():
+                        if(inst.type == "sw"):
+                            is_store_loaded = True
+                        memory_issued += 1
+                        issued = self.l_pre_alu1
+                elif(inst.is_arithematic):
+                    if not self.l_pre_alu2.is_full():
+                        issued = self.l_pre_alu2
+                elif(inst.is_logical):
+                    if not self.l_pre_alu3.is_full():
+                        issued = self.l_pre_alu3
+            # a sw held back for any reason keeps later memory ops behind it
+            if issued is None and inst.type == "sw":
+                is_store_loaded = True
+            if loads_in_order and issued is None and inst.type == "lw":
+                is_load_waiting = True
+            if issued is not None:
+                self.active_inst_list.append(inst)
+                if forwarding and inst.destination is not None:
+                    self.producers[inst.destination] = inst
+                self.pre_issue_board.remove(inst)
+                issued.enqueue(self.r_pre_issue.arbitrary_remove(i))
+                issued_count += 1
+                self.moves += 1
+            else:
+                if self.stats is not None:
+                    self.stats.stall(self.issue_stall_cause(inst, memory_blocked))
+                skipped.add(inst)
+                i += 1
+
+    def alu1(self):
+        forwarding = self.config.forwarding
+        # with a cache, pre-MEM only has room for what MEM lets go this cycle
+        if self.cache is not None:
+            space = self.r_pre_mem.size - self.r_pre_mem.count + self.mem_leaving()
+        for unit in range(min(self.config.alu1_units, self.r_pre_alu1.count)):
+            # extra units stall rather than overrun the output latch
+            if self.l_pre_mem.count == self.l_pre_mem.size:
+                break
+            if self.cache is not None and self.l_pre_mem.count >= space:
+                break
+            # a bypassed operand that is not there yet holds the unit
+            if forwarding and not self.operands_ready(self.r_pre_alu1[0]):
+                break
+            # without a cache lw reads memory here, before MEM has run this
+            # cycle; with forwarding a sw can be right ahead of it, so it
+            # waits for an older sw to the same word
+            if forwarding and self.cache is None and self.r_pre_alu1[0].type == "lw" and \
+                    self.store_pending(self.r_pre_alu1[0]):
+                break
+            instruction_1 = self.r_pre_alu1.dequeue()
+            self.moves += 1
+            if instruction_1.type == "lw" and self.cache is None:
+                source_1, source_2 = self.operands(instruction_1)
+                instruction_1.temp_ans = self.memory_stack.load(instruction_1.immediate + source_1)
+            elif instruction_1.type == "sw":
+                #DO that in mem function
+                pass
+            
+            if self.l_pre_mem.count < self.l_pre_mem.size:
+                self.l_pre_mem.enqueue(instruction_1)
+
+    def alu2(self):
+        forwarding = self.config.forwarding
+        for unit in range(min(self.config.alu2_units, self.r_pre_alu2.count)):
+            # extra units stall rather than overrun the output latch
+            if self.l_post_alu2.count == self.l_post_alu2.size:
+                break
+            if forwarding and not self.operands_ready(self.r_pre_alu2[0]):
+                break
+            instruction_2 = self.r_pre_alu2.dequeue()
+            self.moves += 1
+            source_1, source_2 = self.operands(instruction_2)
+            if instruction_2.type == "add":
+                instruction_2.temp_ans = source_1 + source_2
+            elif instruction_2.type == "sub":
+                instruction_2.temp_ans = source_1 - source_2
+            elif instruction_2.type == "addi":
+                instruction_2.temp_ans = source_1 + instruction_2.immediate
+
+            if self.l_post_alu2.count < self.l_post_alu2.size:
+                 self.l_post_alu2.enqueue(instruction_2)
+
+    def alu3(self):
+        forwarding = self.config.forwarding
+        for unit in range(min(self.config.alu3_units, self.r_pre_alu3.count)):
+            # extra units stall rather than overrun the output latch
+            if self.l_post_alu3.count == self.l_post_alu3.size:
+                break
+            if forwarding and not self.operands_ready(self.r_pre_alu3[0]):
+                break
+            instruction_3 = self.r_pre_alu3.dequeue()
+            self.moves += 1
+            source_1, source_2 = self.operands(instruction_3)
+            if instruction_3.type == "and":
+                instruction_3.temp_ans = source_1 & source_2
+            elif instruction_3.type == "or":
+                instruction_3.temp_ans = source_1 | source_2
+            elif instruction_3.type == "andi":
+                instruction_3.temp_ans = source_1 & instruction_3.immediate
+            elif instruction_3.type == "ori":
+                instruction_3.temp_ans = source_1 | instruction_3.immediate
+            elif instruction_3.type == "sll":
+                instruction_3.temp_ans = source_1 << instruction_3.immediate
+            elif instruction_3.type == "sra":
+                instruction_3.temp_ans = source_1 >> instruction_3.immediate
+
+            if self.l_post_alu3.count < self.l_post_alu3.size:
+                self.l_post_alu3.enqueue(instruction_3)
+
+    def mem(self):
+        forwarding = self.config.forwarding
+        for unit in range(min(self.config.alu1_units, self.r_pre_mem.count)):
+            if self.r_pre_mem[0].type == "lw" and self.l_post_mem.count == self.l_post_mem.size:
+                break
+            if forwarding and not self.operands_ready(self.r_pre_mem[0]):
+                break
+            if self.cache is not None and self.mem_ready(self.r_pre_mem[0]) > self.cycle:
+                break
+            instruction = self.r_pre_mem.dequeue()
+            self.moves += 1
+            if instruction.type == "sw":
+                source_1, source_2 = self.operands(instruction)
+                self.memory_stack.store(instruction.immediate + source_2, source_1)
+                self.remove_active(instruction)
+                self.retire(instruction)
+                # self.l_post_mem.enqueue(instruction)
+            elif instruction.type == "lw":
+                if self.cache is not None:
+                    # read when the access completes, so a store held ahead
+                    # of it in pre-MEM has written first
+                    source_1, source_2 = self.operands(instruction)
+                    instruction.temp_ans = self.memory_stack.load(instruction.immediate + source_1)
+                self.l_post_mem.enqueue(instruction)
+            else:
+                pass
+        # instruction = self.r_pre_mem.dequeue()
+
+    def store_pending(self, load):
+        # Whether an older sw in pre-MEM may write the word load reads; one
+        # whose operands are not there yet might.
+        address = load.immediate + self.operands(load)[0]
+        for latch in (self.r_pre_mem, self.l_pre_mem):
+            for inst in latch:
+                if inst.type == "sw" and inst.seq < load.seq:
+                    if not self.operands_ready(inst):
+                        return True
+                    if inst.immediate + self.operands(inst)[1] == address:
+                        return True
+        return False
+
+    def mem_ready(self, inst):
+        # The cycle the cache is done with inst. The access starts the first
+        # time this is asked, with inst at the head of pre-MEM, so only one
+        # is in progress at a time.
+        if inst.mem_ready is None:
+            source_1, source_2 = self.operands(inst)
+            if inst.type == "sw":
+                latency = self.cache.access(inst.immediate + source_2, True)
+            else:
+                latency = self.cache.access(inst.immediate + source_1, False)
+            inst.mem_ready = self.cycle + latency - 1
+            if latency > 1:
+                self.schedule_wakeup(inst.mem_ready)
+        return inst.mem_ready
+
+    def mem_leaving(self):
+        # How many pre-MEM entries have finished their cache access this
+        # cycle, up to one per unit.
+        leaving = 0
+        while leaving < min(self.config.alu1_units, self.r_pre_mem.count) and \
+                self.mem_ready(self.r_pre_mem[leaving]) <= self.cycle:
+            leaving += 1
+        return leaving
+
+    def wb(self):
+        while self.r_post_mem.count > 0:
+            instruction_1 = self.r_post_mem.dequeue()
+            self.moves += 1
+            if instruction_1.type == "lw":
+                self.register_stack[instruction_1.destination] = instruction_1.temp_ans
+                self.remove_active(instruction_1)
+                self.retire(instruction_1)
+        while self.r_post_alu2.count > 0:
+            instruction_2 = self.r_post_alu2.dequeue()
+            self.moves += 1
+            self.register_stack[instruction_2.destination] = instruction_2.temp_ans
+            self.remove_active(instruction_2)
+            self.retire(instruction_2)
+        while self.r_post_alu3.count > 0:
+            instruction_3 = self.r_post_alu3.dequeue()
+            self.moves += 1
+            self.register_stack[instruction_3.destination] = instruction_3.temp_ans
+            self.remove_active(instruction_3)
+            self.retire(instruction_3)
+        # for i in range(len(self.l_pre_issue.buffer)):
+        #     self.r_pre_issue.enqueue(self.l_pre_issue.dequeue())
+        for inst in self.l_pre_issue:
+            if not inst.speculative:
+                self.pre_issue_board.add(inst)
+        if self.config.forwarding:
+            # results entering the post latches are on the bypass next cycle
+            for latch in (self.l_post_alu2, self.l_post_alu3, self.l_post_mem):
+                for inst in latch:
+                    inst.result_ready = True
+        for latch in self.latches:
+            latch.commit()
+
+        #To change Active status of the instructions
+        #delete that instruction from the list of all active instructions 
+
+class CycleRecord:
+    # One cycle of a pipelined run for in-process consumers. Instructions
+    # are identified by their fetch sequence number (Instruction.seq) and
+    # addresses maps every one in the record to its PC. waiting/executed are
+    # the IF unit slots (None when empty) and queues maps each snapshot queue
+    # title to the IDs in it, oldest first. registers and memory hold only
+    # what changed since the previous record (everything in the first).
+    # idle is the number of identical cycles skipped after this one, and
+    # stop marks the last cycle.
+    __slots__ = ('cycle', 'idle', 'stop', 'waiting', 'executed', 'queues', 'addresses',
+                 'registers', 'memory')
+
+    def __init__(self, cycle, idle, stop, waiting, executed, queues, addresses, registers, memory):
+        self.cycle = cycle
+        self.idle = idle
+        self.stop = stop
+        self.waiting = waiting
+        self.executed = executed
+        self.queues = queues
+        self.addresses = addresses
+        self.registers = registers
+        self.memory = memory
+
+class CycleRecorder:
+    # Builds CycleRecords from a running Processing, remembering the
+    # registers and journalling stores so that only changes are sent.
+    def __init__(self, processor):
+        self.processor = processor
+        self.registers = None
+        processor.memory_stack.enable_journal()
+
+    def capture(self, idle=0):
+        processor = self.processor
+        addresses = {}
+        slots = []
+        for buffer in (processor.wait, processor.exec):
+            if buffer.count:
+                inst = buffer[0]
+                addresses[inst.seq] = inst.inst_count
+                slots.append(inst.seq)
+            else:
+                slots.append(None)
+        queues = {}
+        for title, size, queue in processor.snapshot_queues():
+            ids = []
+            for inst in queue:
+                addresses[inst.seq] = inst.inst_count
+                ids.append(inst.seq)
+            queues[title] = tuple(ids)
+        registers = processor.register_stack
+        previous = self.registers
+        if previous is None:
+            changed = dict(enumerate(registers))
+        else:
+            changed = {k: value for k, value in enumerate(registers) if value != previous[k]}
+        self.registers = list(registers)
+        memory = processor.memory_stack
+        if previous is None:
+            stored = dict(memory.items())
+        else:
+            words = memory.words
+            stored = {memory.base + 4 * index: words[index] for index in memory.journal}
+        memory.journal.clear()
+        return CycleRecord(processor.cycle, idle, processor.stop, slots[0], slots[1], queues,
+                           addresses, changed, stored)
+
+class TraceWriter:
+    # Decides which cycles go into simulation.txt and how they are written.
+    #   full  - every selected cycle in the original snapshot format
+    #   delta - a full first record, then only the queue slots, registers
+    #           and memory words that changed since the previous record
+    #   final - only the last cycle, as a full snapshot
+    #   none  - nothing
+    # every=N keeps every Nth cycle (the last cycle is always kept) and
+    # window=(start, end) keeps only the cycles in that inclusive range.
+    # Records are collected and written to f in large chunks.
+    MODES = ('full', 'delta', 'final', 'none')
+    FLUSH_SIZE = 1 << 20
+
+    def __init__(self, f, mode='full', every=1, window=None):
+        if mode not in self.MODES:
+            raise Exception(f"Unknown trace mode {mode}")
+        self.f = f
+        self.mode = mode
+        self.every = every
+        self.window = window
+        self.pending = []
+        self.pending_size = 0
+        self.last_slots = None
+        self.last_registers = None
+        self.last_memory = None
+
+    def wants(self, processor):
+        cycle = processor.cycle
+        if self.window is not None and not (self.window[0] <= cycle <= self.window[1]):
+            return False
+        return processor.stop or (cycle - 1) % self.every == 0
+
+    def record(self, processor):
+        if self.mode == 'final' or self.mode == 'none' or not self.wants(processor):
+            return
+        if self.mode == 'delta':
+            text = self.delta_text(processor)
+        else:
+            text = processor.snapshot_text()
+        self.write(text)
+
+    def skip(self, processor, first, last, expand=True):
+        # Cycles first..last are identical to the one just recorded apart from
+        # their number. Expanded, each is recorded as if it had been simulated;
+        # compressed, the whole stretch becomes a single line.
+        if self.mode == 'final' or self.mode == 'none':
+            return
+        if expand:
+            cycle = processor.cycle
+            for processor.cycle in range(first, last + 1):
+                self.record(processor)
+            processor.cycle = cycle
+        else:
+            if self.window is not None:
+                first = max(first, self.window[0])
+                last = min(last, self.window[1])
+            if first <= last:
+                self.write(f"{'-'*20}\nCycles {first}-{last}: no change\n")
+
+    def finish(self, processor):
+        if self.mode == 'final':
+            self.write(processor.snapshot_text())
+        self.flush()
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.f.write(''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def delta_text(self, processor):
+        slots = processor.snapshot_slots()
+        registers = list(processor.register_stack)
+        memory = processor.memory_stack.words[:]
+        if self.last_slots is None:
+            text = processor.snapshot_text()
+        else:
+            parts = ['-'*20, '\n', f'Cycle {processor.cycle}:\n']
+            for (label, shown), (_, last_shown) in zip(slots, self.last_slots):
+                if shown != last_shown:
+                    parts.append(f'{label}: [{shown}]\n' if shown else f'{label}:\n')
+            for i, value in enumerate(registers):
+                if value != self.last_registers[i]:
+                    parts.append(f'x{i:02d}:\t{value}\n')
+            if memory != self.last_memory:
+                for mem_ad, value, last_value in zip(processor.memory_stack, memory, self.last_memory):
+                    if value != last_value:
+                        parts.append(f'{mem_ad}:\t{value}\n')
+            text = ''.join(parts)
+        self.last_slots = slots
+        self.last_registers = registers
+        self.last_memory = memory
+        return text
+
+class HostProfiler:
+    # Opt-in timing of the simulator itself. instrument() swaps the listed
+    # methods of one object for timed wrappers, so a run without a profiler
+    # executes the plain methods. Each call adds its inclusive time to its
+    # label and its self time to its call stack (for collapsed-stack output);
+    # the first max_events calls are also kept as Chrome trace events.
+    PROCESSING_METHODS = ('fetch', 'issue', 'alu1', 'alu2', 'alu3', 'mem', 'wb',
+                          'decode_at', 'dependency_check', 'snapshot_text')
+    TRACE_METHODS = ('record', 'skip', 'finish', 'flush')
+
+    def __init__(self, max_events=200000):
+        self.calls = {}
+        self.totals = {}
+        self.collapsed = {}
+        self.events = []
+        self.max_events = max_events
+        self.dropped_events = 0
+        self.stack = []
+        self.child_time = [0.0]
+        self.origin = time.perf_counter()
+
+    def instrument(self, obj, names, prefix=''):
+        for name in names:
+            setattr(obj, name, self.timed(prefix + name, getattr(obj, name)))
+
+    def timed(self, label, func):
+        perf_counter = time.perf_counter
+        def wrapper(*args, **kwargs):
+            self.stack.append(label)
+            self.child_time.append(0.0)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.leave(label, start, perf_counter() - start)
+        return wrapper
+
+    @contextlib.contextmanager
+    def section(self, label):
+        self.stack.append(label)
+        self.child_time.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.leave(label, start, time.perf_counter() - start)
+
+    def leave(self, label, start, elapsed):
+        key = tuple(self.stack)
+        self.stack.pop()
+        children = self.child_time.pop()
+        self.child_time[-1] += elapsed
+        self.calls[label] = self.calls.get(label, 0) + 1
+        self.totals[label] = self.totals.get(label, 0.0) + elapsed
+        self.collapsed[key] = self.collapsed.get(key, 0.0) + elapsed - children
+        if len(self.events) < self.max_events:
+            self.events.append((label, start, elapsed))
+        else:
+            self.dropped_events += 1
+
+    def rows(self):
+        # (label, calls, inclusive seconds, self seconds), slowest first
+        own = {}
+        for key, seconds in self.collapsed.items():
+            own[key[-1]] = own.get(key[-1], 0.0) + seconds
+        return sorted(((label, self.calls[label], self.totals[label], own.get(label, 0.0))
+                       for label in self.calls), key=lambda row: -row[2])
+
+    def table(self):
+        wall = self.child_time[0] or 1.0
+        lines = [f"{'section':<24}{'calls':>10}{'total s':>12}{'self s':>12}{'us/call':>14}{'self %':>8}"]
+        for label, calls, total, own in self.rows():
+            lines.append(f"{label:<24}{calls:>10}{total:>12.4f}{own:>12.4f}"
+                         f"{total / calls * 1e6:>14.2f}{own / wall * 100:>8.1f}")
+        if self.dropped_events:
+            lines.append(f"({self.dropped_events} calls not kept as trace events)")
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed(self, f):
+        # flamegraph.pl / speedscope input: "a;b;c <self microseconds>"
+        for key, seconds in sorted(self.collapsed.items()):
+            f.write(f"{';'.join(key)} {round(seconds * 1e6)}\n")
+
+    def write_chrome_trace(self, f):
+        events = [{'name': label, 'ph': 'X', 'pid': 0, 'tid': 0,
+                   'ts': (start - self.origin) * 1e6, 'dur': elapsed * 1e6}
+                  for label, start, elapsed in self.events]
+        json.dump({'traceEvents': events, 'otherData': {'dropped_events': self.dropped_events}}, f)
+
+class StateHasher:
+    # One 8-byte digest of the machine state per cycle: PC, the instruction
+    # in every IF and latch slot (by address), registers and the data memory
+    # digest. The cycle number itself is not included, so idle cycles repeat
+    # the previous digest. The stream written to f (a binary file) is a
+    # header holding the first cycle, then the digests in cycle order.
+    MAGIC = b'VSIMHSH1'
+    HEADER = struct.Struct('<8sQ')
+    CHUNK = 1 << 16
+
+    def __init__(self, f):
+        self.f = f
+        self.first_cycle = None
+        self.pending = bytearray()
+        self.last = None
+
+    def record(self, processor):
+        memory = processor.memory_stack
+        if memory.digest is None:
+            memory.enable_digest()
+        if self.first_cycle is None:
+            self.first_cycle = processor.cycle
+            self.f.write(self.HEADER.pack(self.MAGIC, self.first_cycle))
+        state = [processor.program_counter,
+                 processor.wait[0].inst_count if processor.wait.count else 0,
+                 processor.exec[0].inst_count if processor.exec.count else 0,
+                 memory.digest]
+        for latch in processor.latches:
+            right = latch.right
+            state.append(right.count)
+            if right.count:
+                state += [inst.inst_count for inst in right]
+        try:
+            words = array('Q', state)
+            registers = array('q', processor.register_stack)
+            if sys.byteorder != 'little':
+                words.byteswap()
+                registers.byteswap()
+            data = words.tobytes() + registers.tobytes()
+        except OverflowError:
+            # a register outgrew 64 bits
+            data = repr((state, processor.register_stack)).encode()
+        self.last = hashlib.blake2b(data, digest_size=8).digest()
+        self.pending += self.last
+        if len(self.pending) >= self.CHUNK:
+            self.flush()
+
+    def skip(self, cycles):
+        self.pending += self.last * cycles
+        if len(self.pending) >= self.CHUNK:
+            self.flush()
+
+    def flush(self):
+        self.f.write(self.pending)
+        self.pending = bytearray()
+
+def read_hashes(f):
+    # -> (first cycle, digest bytes) from a StateHasher stream
+    magic, first_cycle = StateHasher.HEADER.unpack(f.read(StateHasher.HEADER.size))
+    if magic != StateHasher.MAGIC:
+        raise Exception("Not a state hash stream")
+    return first_cycle, f.read()
+
+def first_divergence(golden, run):
+    # Both are (first cycle, digests). Returns the first cycle present in
+    # both whose digests differ, the first cycle only one of them has, or
+    # None if they agree.
+    first = max(golden[0], run[0])
+    golden_digests = golden[1][8 * (first - golden[0]):]
+    run_digests = run[1][8 * (first - run[0]):]
+    common = min(len(golden_digests), len(run_digests))
+    if golden_digests[:common] == run_digests[:common]:
+        if len(golden_digests) == len(run_digests):
+            return None
+        return first + common // 8
+    low, high = 0, common // 8
+    # first differing 8-byte digest, by bisection on equal prefixes
+    while high - low > 1:
+        middle = (low + high) // 2
+        if golden_digests[:8 * middle] == run_digests[:8 * middle]:
+            low = middle
+        else:
+            high = middle
+    return first + low
+
+CHECKPOINT_MAGIC = b'VSIMCKP1'
+
+def checkpoint_path(directory, cycle):
+    return os.path.join(directory, f'cycle-{cycle:010d}.ckpt')
+
+def save_checkpoint(processor, path):
+    # The whole Processing object as it stands before processor.cycle runs,
+    # pickled and zlib-compressed. Written to a temporary name first so an
+    # interrupted run never leaves a truncated checkpoint behind.
+    data = zlib.compress(pickle.dumps(processor, pickle.HIGHEST_PROTOCOL), 6)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(CHECKPOINT_MAGIC)
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+def load_checkpoint(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(CHECKPOINT_MAGIC):
+        raise Exception(f"{path} is not a checkpoint")
+    return pickle.loads(zlib.decompress(data[len(CHECKPOINT_MAGIC):]))
+
+def latest_checkpoint(directory, cycle=None):
+    # The cycle of the latest checkpoint in directory taken at or before
+    # cycle, None if there is none.
+    best = None
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.startswith('cycle-') and name.endswith('.ckpt'):
+                taken = int(name[len('cycle-'):-len('.ckpt')])
+                if (cycle is None or taken <= cycle) and (best is None or taken > best):
+                    best = taken
+    return best
+
+def find_checkpoint(directory, cycle=None):
+    # The latest checkpoint in directory taken at or before cycle.
+    best = latest_checkpoint(directory, cycle)
+    if best is None:
+        raise Exception(f"No checkpoint in {directory}" + (f" at or before cycle {cycle}" if cycle else ""))
+    return checkpoint_path(directory, best)
+
+def pipelining(processor, f, config=None, profiler=None, resume=False, hasher=None, until=None,
+               subscribers=(), last_cycle=None):
+    # Cycle-accurate run; the trace goes to f (None for no trace) and the
+    # per-cycle state digests to hasher, if there is one. With resume=True
+    # the processor comes from a checkpoint and carries on from its own
+    # cycle instead of cycle 1. until stops the run, ready to resume at the
+    # next cycle, once that many instructions have retired; last_cycle stops
+    # it after that cycle.
+    # The text trace, counters, digests and any subscribers (callables taking
+    # a CycleRecord) are all consumers of Processing.run_cycles().
+    if config is None:
+        config = SimConfig()
+    tracer = TraceWriter(f, config.trace_mode if f is not None else 'none',
+                         config.trace_every, config.trace_window)
+    if profiler is not None:
+        profiler.instrument(tracer, HostProfiler.TRACE_METHODS, 'trace.')
+    if not resume:
+        processor.cycle = 1
+    recorder = CycleRecorder(processor) if subscribers else None
+    try:
+        for idle in processor.run_cycles(until, config.checkpoint_every, config.checkpoint_dir,
+                                         config.max_cycles, last_cycle):
+            if processor.stats is not None:
+                processor.stats.end_cycle(processor)
+            tracer.record(processor)
+            if hasher is not None:
+                hasher.record(processor)
+            if recorder is not None:
+                record = recorder.capture(idle)
+                for subscriber in subscribers:
+                    subscriber(record)
+            if idle:
+                tracer.skip(processor, processor.cycle + 1, processor.cycle + idle, config.expand_idle)
+                if processor.stats is not None:
+                    processor.stats.skip(processor, idle)
+                if hasher is not None:
+                    hasher.skip(idle)
+    except BaseException:
+        # what was simulated up to the error is kept for debugging it
+        tracer.flush()
+        if hasher is not None:
+            hasher.flush()
+        raise
+    tracer.finish(processor)
+    if hasher is not None:
+        hasher.flush()
+    # processor.print_snapshot(f)
+    # print(processor.program_counter)
+
+class BlockTranslator:
+    # Functional-mode fast path. A basic block is the run of instructions from
+    # an entry PC up to and including the first branch, jal or break. Each is
+    # compiled once into a Python function that works on the registers and
+    # memory directly and returns the next PC, and is cached by entry PC.
+    # Instructions come from the load-time program (all_instructions), which
+    # sw never writes, so a cached block cannot go stale.
+    TEMPLATES = {
+        'addi': "r[{d}] = r[{s1}] + {imm}",
+        'add': "r[{d}] = r[{s1}] + r[{s2}]",
+        'sub': "r[{d}] = r[{s1}] - r[{s2}]",
+        'and': "r[{d}] = r[{s1}] & r[{s2}]",
+        'or': "r[{d}] = r[{s1}] | r[{s2}]",
+        'andi': "r[{d}] = r[{s1}] & {imm}",
+        'ori': "r[{d}] = r[{s1}] | {imm}",
+        'sll': "r[{d}] = r[{s1}] << {imm}",
+        'sra': "r[{d}] = r[{s1}] >> {imm}",
+        'lw': "r[{d}] = load({imm} + r[{s1}])",
+        'sw': "store({imm} + r[{s2}], r[{s1}])",
+        'beq': "return {target} if r[{s1}] == r[{s2}] else {next}",
+        'bne': "return {target} if r[{s1}] != r[{s2}] else {next}",
+        'blt': "return {target} if r[{s1}] < r[{s2}] else {next}",
+        'jal': "r[{d}] = {next}\n    return {target}",
+        'break': "return {pc}",
+    }
+    SIGNATURE = "def block(r, load, store):"
+
+    def __init__(self, processor):
+        self.processor = processor
+        # entry PC -> (function, instructions in the block, ends in break)
+        self.blocks = {}
+        # globals for the compiled blocks
+        self.names = {}
+
+    def get(self, pc):
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.blocks[pc] = self.translate(pc)
+        return block
+
+    def translate(self, pc):
+        lines = []
+        address = pc
+        count = 0
+        while True:
+            try:
+                inst = self.processor.decoded_at(address)
+            except KeyError:
+                # ran off the program; fail when that PC is reached, as the
+                # interpreter would
+                if not count:
+                    raise
+                lines.append(f"return {address}")
+                break
+            count += 1
+            template = self.TEMPLATES.get(inst.type)
+            if template is None:
+                lines.append(f"raise Exception({f'Unknown instruction {inst.binary} at {address}'!r})")
+                break
+            lines.append(template.format(d=inst.destination, s1=inst.source_1, s2=inst.source_2,
+                                         imm=inst.immediate, pc=address, next=address + 4,
+                                         target=address + (inst.immediate or 0) * 2))
+            if inst.is_branch or inst.type == "break":
+                break
+            address += 4
+        source = self.SIGNATURE + "\n    " + "\n    ".join(lines) + "\n"
+        namespace = dict(self.names)
+        exec(compile(source, f"<block {pc}>", 'exec'), namespace)
+        return namespace['block'], count, inst.type == "break"
+
+def run_functional(processor, f=None, translate=True, limit=None):
+    # ISA-only execution: every instruction retires as soon as it is reached,
+    # so there are no queues, no hazards and no per-cycle snapshot. Only the
+    # final Registers/Data block is written, in the same format as the trace.
+    # Basic blocks are translated to Python functions unless translate=False,
+    # which steps the per-instruction interpreter instead. A run that has not
+    # reached break after limit instructions is an error.
+    if limit is None:
+        limit = float('inf')
+    registers = processor.register_stack
+    load = processor.memory_stack.load
+    store = processor.memory_stack.store
+    decoded_program = processor.decoded_program
+    retired = 0
+    if translate:
+        translator = BlockTranslator(processor)
+        blocks = translator.blocks
+        pc = processor.program_counter
+        while True:
+            block = blocks.get(pc)
+            if block is None:
+                block = translator.get(pc)
+            function, count, stop = block
+            pc = function(registers, load, store)
+            retired += count
+            if stop:
+                break
+            if retired > limit:
+                raise Exception(f"No break after {limit} instructions")
+        processor.program_counter = pc
+    else:
+        while True:
+            pc = processor.program_counter
+            inst = decoded_program.get(pc)
+            if inst is None:
+                inst = processor.decoded_at(pc)
+            inst_type = inst.type
+            retired += 1
+            if retired > limit and inst_type != "break":
+                raise Exception(f"No break after {limit} instructions")
+            if inst.is_branch:
+                processor.process_branch(inst)
+                continue
+            if inst_type == "addi":
+                registers[inst.destination] = registers[inst.source_1] + inst.immediate
+            elif inst_type == "add":
+                registers[inst.destination] = registers[inst.source_1] + registers[inst.source_2]
+            elif inst_type == "sub":
+                registers[inst.destination] = registers[inst.source_1] - registers[inst.source_2]
+            elif inst_type == "lw":
+                registers[inst.destination] = load(inst.immediate + registers[inst.source_1])
+            elif inst_type == "sw":
+                store(inst.immediate + registers[inst.source_2], registers[inst.source_1])
+            elif inst_type == "and":
+                registers[inst.destination] = registers[inst.source_1] & registers[inst.source_2]
+            elif inst_type == "or":
+                registers[inst.destination] = registers[inst.source_1] | registers[inst.source_2]
+            elif inst_type == "andi":
+                registers[inst.destination] = registers[inst.source_1] & inst.immediate
+            elif inst_type == "ori":
+                registers[inst.destination] = registers[inst.source_1] | inst.immediate
+            elif inst_type == "sll":
+                registers[inst.destination] = registers[inst.source_1] << inst.immediate
+            elif inst_type == "sra":
+                registers[inst.destination] = registers[inst.source_1] >> inst.immediate
+            elif inst_type == "break":
+                break
+            else:
+                raise Exception(f"Unknown instruction {inst.binary} at {pc}")
+            processor.program_counter = pc + 4
+    processor.instructions_retired = retired
+    processor.stop = True
+    if f is not None:
+        processor.display_cycle_registers(f)
+
+def detailed_window(processor, pipeline, warmup, window, cache=None):
+    # Runs the cycle-accurate pipeline from the architectural state of
+    # processor (registers, memory, PC), on copies so processor itself is
+    # left alone. The pipeline starts empty, with a copy of cache if one is
+    # given, and is warmed up for warmup instructions before window of them
+    # are measured. Returns (instructions, cycles) for the measured part, or
+    # None if the program ended first.
+    detail = Processing(pipeline)
+    if cache is not None:
+        detail.cache = copy.deepcopy(cache)
+    detail.instruction_stack = processor.instruction_stack
+    detail.all_instructions = processor.all_instructions
+    detail.decoded_program = processor.decoded_program
+    detail.break_instruction_count = processor.break_instruction_count
+    detail.register_stack = list(processor.register_stack)
+    detail.memory_stack = copy.deepcopy(processor.memory_stack)
+    detail.program_counter = processor.program_counter
+    config = SimConfig(trace_mode='none', pipeline=pipeline)
+    if warmup:
+        pipelining(detail, None, config, resume=True, until=warmup)
+        if detail.stop:
+            return None
+    start_cycle = detail.cycle
+    start_retired = detail.instructions_retired
+    pipelining(detail, None, config, resume=True, until=start_retired + window)
+    retired = detail.instructions_retired - start_retired
+    if not retired:
+        return None
+    # a run that reached break stops on its last cycle rather than after it
+    return retired, detail.cycle - start_cycle + detail.stop
+
+def run_sampled(processor, pipeline=None, interval=100000, window=2000, warmup=1000):
+    # Sampled simulation: the program runs functionally, as run_functional
+    # does with translated blocks, and from every interval-th instruction on
+    # (at block granularity, starting with the first) a detailed_window() is
+    # simulated. Returns the SampledEstimate. A data cache is kept warm
+    # through the fast-forward, since a few thousand instructions are not
+    # enough to fill it, and each window starts from a copy.
+    registers = processor.register_stack
+    load = processor.memory_stack.load
+    store = processor.memory_stack.store
+    cache = None
+    if pipeline is not None and pipeline.cache_sets is not None:
+        cache = DataCache(pipeline)
+        memory_load = load
+        memory_store = store
+
+        def load(address):
+            cache.access(address, False)
+            return memory_load(address)
+
+        def store(address, value):
+            cache.access(address, True)
+            memory_store(address, value)
+    translator = BlockTranslator(processor)
+    blocks = translator.blocks
+    samples = []
+    pc = processor.program_counter
+    retired = 0
+    next_sample = 0
+    while True:
+        if retired >= next_sample:
+            processor.program_counter = pc
+            sample = detailed_window(processor, pipeline, warmup, window, cache)
+            if sample is not None:
+                samples.append((retired,) + sample)
+            next_sample += interval
+        block = blocks.get(pc)
+        if block is None:
+            block = translator.get(pc)
+        function, count, stop = block
+        pc = function(registers, load, store)
+        retired += count
+        if stop:
+            break
+    processor.program_counter = pc
+    processor.instructions_retired = retired
+    processor.stop = True
+    return SampledEstimate(retired, samples)
+
+class SampledEstimate:
+    # Whole-run cycle count extrapolated from the detailed windows of a
+    # sampled run: the mean window CPI times the instructions retired, with
+    # a 95% confidence interval from the spread of the window CPIs (normal
+    # approximation, so it needs two windows and is rough below ~10).
+    Z95 = 1.96
+
+    def __init__(self, instructions, samples):
+        self.instructions = instructions
+        # (first instruction, instructions measured, cycles) per window
+        self.samples = samples
+        cpis = [cycles/count for start, count, cycles in samples]
+        self.cpi = sum(cpis)/len(cpis) if cpis else None
+        self.cpi_error = None
+        if len(cpis) > 1:
+            variance = sum((cpi - self.cpi)**2 for cpi in cpis)/(len(cpis) - 1)
+            self.cpi_error = self.Z95*(variance/len(cpis))**0.5
+
+    @property
+    def cycles(self):
+        return round(self.cpi*self.instructions) if self.cpi is not None else None
+
+    def bounds(self):
+        # (low, high) for the cycle count, or None without an error estimate
+        if self.cpi_error is None:
+            return None
+        return (round((self.cpi - self.cpi_error)*self.instructions),
+                round((self.cpi + self.cpi_error)*self.instructions))
+
+    def report(self):
+        bounds = self.bounds()
+        return {'instructions': self.instructions,
+                'windows': len(self.samples),
+                'measured_instructions': sum(count for start, count, cycles in self.samples),
+                'cpi': self.cpi,
+                'cpi_error_95': self.cpi_error,
+                'cycles': self.cycles,
+                'cycles_95': list(bounds) if bounds else None,
+                'samples': [{'start': start, 'instructions': count, 'cycles': cycles}
+                            for start, count, cycles in self.samples]}
+
+    def summary(self):
+        if self.cpi is None:
+            return f"{self.instructions} instructions, no complete window to estimate cycles from"
+        text = f"{self.instructions} instructions, CPI {self.cpi:.4f}"
+        if self.cpi_error is not None:
+            low, high = self.bounds()
+            text += f" +/- {self.cpi_error:.4f}, estimated cycles {self.cycles} (95%: {low}-{high})"
+        else:
+            text += f", estimated cycles {self.cycles}"
+        return text + f" from {len(self.samples)} windows"
+
+    def write_json(self, f):
+        json.dump(self.report(), f, indent=2)
+        f.write('\n')
+
+class LaneTranslator(BlockTranslator):
+    # BlockTranslator for run_data_batch(): the same basic blocks compiled to
+    # NumPy code that runs the block for every lane in k at once (a slice for
+    # all lanes, else an array of lane numbers). r is the (lanes, 32) register
+    # array, and a conditional branch returns an array of next PCs.
+    TEMPLATES = {
+        'addi': "r[k, {d}] = r[k, {s1}] + {imm}",
+        'add': "r[k, {d}] = r[k, {s1}] + r[k, {s2}]",
+        'sub': "r[k, {d}] = r[k, {s1}] - r[k, {s2}]",
+        'and': "r[k, {d}] = r[k, {s1}] & r[k, {s2}]",
+        'or': "r[k, {d}] = r[k, {s1}] | r[k, {s2}]",
+        'andi': "r[k, {d}] = r[k, {s1}] & {imm}",
+        'ori': "r[k, {d}] = r[k, {s1}] | {imm}",
+        'sll': "r[k, {d}] = r[k, {s1}] << {imm}",
+        'sra': "r[k, {d}] = r[k, {s1}] >> {imm}",
+        'lw': "r[k, {d}] = load(k, {imm} + r[k, {s1}])",
+        'sw': "store(k, {imm} + r[k, {s2}], r[k, {s1}])",
+        'beq': "return where(r[k, {s1}] == r[k, {s2}], {target}, {next})",
+        'bne': "return where(r[k, {s1}] != r[k, {s2}], {target}, {next})",
+        'blt': "return where(r[k, {s1}] < r[k, {s2}], {target}, {next})",
+        'jal': "r[k, {d}] = {next}\n    return {target}",
+        'break': "return {pc}",
+    }
+    SIGNATURE = "def block(r, k, load, store):"
+
+    def __init__(self, processor):
+        super().__init__(processor)
+        self.names = {'where': import_numpy().where}
+
+class DataBatchResult:
+    # Final state of every lane of run_data_batch(): registers is a (lanes,
+    # 32) and memory a (lanes, words) int64 array, instructions and
+    # program_counter one entry per lane.
+    def __init__(self, registers, memory, base, instructions, program_counter):
+        self.registers = registers
+        self.memory = memory
+        self.base = base
+        self.instructions = instructions
+        self.program_counter = program_counter
+
+    def __len__(self):
+        return len(self.registers)
+
+    def lane(self, index):
+        # (registers, {address: value}) in the form of SimulationResult
+        memory = self.memory[index].tolist()
+        return (self.registers[index].tolist(),
+                {self.base + 4 * k: value for k, value in enumerate(memory)})
+
+    def write_npz(self, path):
+        import_numpy().savez(path, registers=self.registers, memory=self.memory,
+                 instructions=self.instructions, program_counter=self.program_counter)
+
+def import_numpy():
+    # only the data-batch engine needs NumPy, so ordinary runs and batch
+    # workers never import it
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("The data-batch engine needs NumPy")
+    return numpy
+
+def run_data_batch(program_words, data_sets):
+    # Functional runs of one program over many initial data segments at once,
+    # one lane per data set: data_sets is a sequence of data segments (or a
+    # (lanes, words) array), each replacing the words after break. Lanes at
+    # the same PC run a translated block together. When branches split them,
+    # the lanes that have taken the fewest backward branches go first, then
+    # the lowest PC: the others wait, the lanes join up again where the paths
+    # meet, and a loop iteration is finished by every lane before any of
+    # them starts the next. Registers are int64 here, so a value that
+    # leaves 64 bits wraps where the scalar run would not (it could not be
+    # stored there either). Returns a DataBatchResult.
+    np = import_numpy()
+    processor = Processing()
+    load_program(processor, program_words)
+    base = processor.memory_stack.base
+    memory = np.array(data_sets, dtype=np.int64)
+    if memory.ndim != 2 or memory.shape[1] != len(processor.memory_stack):
+        raise Exception(f"Each data set must have {len(processor.memory_stack)} words, "
+                        f"like the program's data segment")
+    lanes, words = memory.shape
+    everyone = slice(None)
+    numbers = np.arange(lanes)
+
+    def index(address):
+        # DataMemory.index() for an array of addresses
+        offset = address - (base if base is not None else address + 1)
+        bad = (offset < 0) | (offset & 3 != 0) | (offset >= 4 * words)
+        if bad.any():
+            raise Exception(f"Memory address {address[bad.argmax()]} out of bounds")
+        return offset >> 2
+
+    def load(k, address):
+        return memory[numbers if k is everyone else k, index(address)]
+
+    def store(k, address, value):
+        memory[numbers if k is everyone else k, index(address)] = value
+
+    registers = np.zeros((lanes, 32), dtype=np.int64)
+    program_counter = np.full(lanes, processor.program_counter, dtype=np.int64)
+    instructions = np.zeros(lanes, dtype=np.int64)
+    # backward branches taken << 32 | PC; finished lanes are pushed past all
+    # the others
+    order = program_counter.copy()
+    finished = np.int64(1) << 62
+    translator = LaneTranslator(processor)
+    blocks = translator.blocks
+    running = lanes
+    while running:
+        key = order.min()
+        k = (order == key).nonzero()[0]
+        if len(k) == lanes:
+            k = everyone
+        pc = int(key) & 0xffffffff
+        block = blocks.get(pc)
+        if block is None:
+            block = translator.get(pc)
+        function, count, stop = block
+        next_pc = function(registers, k, load, store)
+        program_counter[k] = next_pc
+        instructions[k] += count
+        if stop:
+            order[k] = finished
+            running -= lanes if k is everyone else len(k)
+        else:
+            # the last instruction of the block is the branch
+            backward = np.asarray(next_pc <= pc + 4 * (count - 1), dtype=np.int64)
+            order[k] = ((order[k] >> 32) + backward << 32) | next_pc
+    return DataBatchResult(registers, memory, base, instructions, program_counter)
+
+def read_data_sets(path):
+    # Data segments for run_data_batch(): a .npy array of shape (lanes,
+    # words), or text with one data set per line as integers separated by
+    # spaces or commas.
+    if path.endswith('.npy'):
+        return import_numpy().load(path)
+    with open(path) as f:
+        return [[int(value) for value in line.replace(',', ' ').split()]
+                for line in f if line.strip()]
+
+def load_program(processor, program_words, f_dis=None):
+    # program_words are 32-character binary strings (or ints); everything
+    # after break is data. The disassembly goes to f_dis if one is given.
+    if isinstance(program_words, ProgramImage):
+        load_image(processor, program_words, f_dis)
+        return
+    temp_break_flag = False
+    temp_instruction_counter = 256
+
+    for bin in program_words:
+        if isinstance(bin, int):
+            bin = format(bin & 0xffffffff, '032b')
+        bin = bin.strip()
+        if not bin:
+            continue
+
+        if (temp_break_flag):
+            if f_dis is not None:
+                f_dis.write(bin+"\t"+str(temp_instruction_counter)+"\t"+str(twos_complement_to_decimal(bin))+"\n")
+            processor.memory_stack.append(temp_instruction_counter, twos_complement_to_decimal(bin))
+        else:
+            instruction = DecodedInstruction(bin, temp_instruction_counter)
+            if f_dis is not None:
+                f_dis.write(bin+"\t"+str(temp_instruction_counter)+"\t"+instruction.inst_print+"\n")
+            processor.instruction_stack[temp_instruction_counter] = instruction.inst_print
+            processor.decoded_program[temp_instruction_counter] = instruction
+            if instruction.type == "break":
+                processor.break_instruction_count = temp_instruction_counter
+                temp_break_flag = True
+        # processor.all_instructions[temp_instruction_counter] = instruction
+        processor.all_instructions[temp_instruction_counter] = bin
+        temp_instruction_counter += 4
+
+class ProgramImage:
+    # A program in the packed binary format: a header, then every word of the
+    # text format (code, break, data) as a little-endian uint32. The file is
+    # memory-mapped; code words are turned into instructions only when they
+    # are fetched (Processing.all_instructions is the image itself) and the
+    # data segment is copied into DataMemory in one go.
+    MAGIC = b'VSIM'
+    VERSION = 1
+    # magic, version, reserved, word count, index of the break word
+    HEADER = struct.Struct('<4sHHII')
+
+    def __init__(self, path):
+        self.path = path
+        self.open()
+
+    def open(self):
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.HEADER.size:
+                raise Exception(f"{self.path} is too short for a program image")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.break_index = self.HEADER.unpack_from(self.map)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise Exception(f"{self.path} is not a version {self.VERSION} program image")
+        if size != self.HEADER.size + 4 * self.count:
+            raise Exception(f"{self.path} holds {(size - self.HEADER.size) // 4} words, header says {self.count}")
+        self.words = self.view('I', 0, self.count)
+
+    def view(self, typecode, start, stop):
+        # words start..stop-1 as 32-bit values, without a copy where possible
+        data = memoryview(self.map)[self.HEADER.size + 4 * start:self.HEADER.size + 4 * stop]
+        if sys.byteorder == 'little':
+            return data.cast(typecode)
+        values = array(typecode, data)
+        values.byteswap()
+        return values
+
+    def __getstate__(self):
+        # the mapping is reopened in the receiving process
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self.open()
+
+    def __contains__(self, address):
+        index = (address - 256) >> 2
+        return not address & 3 and 0 <= index < self.count
+
+    def __getitem__(self, address):
+        if address not in self:
+            raise KeyError(address)
+        return format(self.words[(address - 256) >> 2], '032b')
+
+    def data_values(self):
+        return array('q', self.view('i', self.break_index + 1, self.count))
+
+def write_image(program_words, path):
+    # Converts a text program (or another image) to the packed format.
+    if isinstance(program_words, ProgramImage):
+        words = array('I', program_words.words)
+    else:
+        words = array('I', (int(word, 2) if isinstance(word, str) else word & 0xffffffff
+                            for word in program_words if not isinstance(word, str) or word.strip()))
+    break_index = len(words)
+    for i, word in enumerate(words):
+        entry = OPCODE_TABLE.get(word & 0x7f)
+        if entry is not None and entry[1] == "break":
+            break_index = i
+            break
+    if sys.byteorder != 'little':
+        words.byteswap()
+    with open(path, 'wb') as f:
+        f.write(ProgramImage.HEADER.pack(ProgramImage.MAGIC, ProgramImage.VERSION, 0,
+                                         len(words), break_index))
+        words.tofile(f)
+
+def load_image(processor, image, f_dis=None):
+    # load_program() for a ProgramImage. Instructions are decoded on first
+    # fetch unless a disassembly is asked for, which needs them all.
+    processor.all_instructions = image
+    if image.break_index < image.count:
+        processor.break_instruction_count = 256 + 4 * image.break_index
+        if image.break_index + 1 < image.count:
+            processor.memory_stack.extend(256 + 4 * (image.break_index + 1), image.data_values())
+    if f_dis is not None:
+        address = 256
+        for i in range(min(image.break_index + 1, image.count)):
+            instruction = processor.decoded_at(address)
+            f_dis.write(f"{instruction.binary}\t{address}\t{instruction.inst_print}\n")
+            address += 4
+        for value in image.view('i', image.break_index + 1, image.count):
+            f_dis.write(f"{format(value & 0xffffffff, '032b')}\t{address}\t{value}\n")
+            address += 4
+
+def read_program(input_file):
+    # Text programs come back as a list of words, binary ones as an image.
+    with open(input_file, 'rb') as f:
+        if f.read(len(ProgramImage.MAGIC)) == ProgramImage.MAGIC:
+            return ProgramImage(input_file)
+    with open(input_file, 'r') as f:
+        return f.read().split()
+
+def disassembly(processor, input_file, output_file='disassembly.txt'):
+    with open(output_file, 'w') as f_dis:
+        load_program(processor, read_program(input_file), f_dis)
+
+class SimConfig:
+    # Everything that selects how a program is run, so one object can be
+    # handed to simulate() or shipped to a batch worker.
+    def __init__(self, functional=False, trace_mode='full', trace_every=1,
+                 trace_window=None, expand_idle=True, pipeline=None, stats=False,
+                 profile=False, checkpoint_every=None, checkpoint_dir='checkpoints',
+                 sample_interval=None, sample_window=2000, sample_warmup=1000, max_cycles=None):
+        self.functional = functional
+        # a run still going after max_cycles cycles (instructions for a
+        # functional run) fails instead of running on
+        self.max_cycles = max_cycles
+        # sample_interval turns on sampled simulation (run_sampled): the
+        # result is functional plus a cycle estimate
+        self.sample_interval = sample_interval
+        self.sample_window = sample_window
+        self.sample_warmup = sample_warmup
+        # pipelining() saves a checkpoint every checkpoint_every cycles
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_dir = checkpoint_dir
+        self.stats = stats
+        self.profile = profile
+        self.pipeline = pipeline if pipeline is not None else PipelineConfig()
+        self.trace_mode = trace_mode
+        if not isinstance(trace_every, int) or trace_every < 1:
+            raise Exception("trace_every must be a positive integer")
+        self.trace_every = trace_every
+        self.trace_window = trace_window
+        self.expand_idle = expand_idle
+
+class SimulationResult:
+    def __init__(self, processor, functional=False):
+        # a functional run has no cycle count
+        self.cycles = None if functional else processor.cycle
+        self.instructions_retired = processor.instructions_retired
+        self.program_counter = processor.program_counter
+        self.registers = list(processor.register_stack)
+        self.memory = dict(processor.memory_stack.items())
+        # the PerfCounters of the run, if SimConfig asked for them
+        self.stats = processor.stats
+        # the HostProfiler of the run, if SimConfig asked for one
+        self.profile = None
+        # the SampledEstimate of a sampled run
+        self.estimate = None
+
+def simulate(program_words, config=None, disassembly_out=None, trace_out=None, hash_out=None,
+             subscribers=()):
+    # Library entry point. disassembly_out and trace_out are writable text
+    # files and hash_out a binary one for the state digest stream (each None
+    # to skip that output); nothing touches the CWD. subscribers are called
+    # with the CycleRecord of every cycle of a cycle-accurate run.
+    if config is None:
+        config = SimConfig()
+    hasher = StateHasher(hash_out) if hash_out is not None and not config.functional else None
+    profiler = HostProfiler() if config.profile else None
+    processor = Processing(config.pipeline)
+    if config.stats and not config.functional:
+        processor.stats = PerfCounters(processor)
+    if config.sample_interval is not None:
+        # processor itself only runs functionally, so there are no counters,
+        # hashes or profile; the trace is the final Registers/Data block
+        load_program(processor, program_words, disassembly_out)
+        estimate = run_sampled(processor, config.pipeline, config.sample_interval,
+                               config.sample_window, config.sample_warmup)
+        if trace_out is not None:
+            processor.display_cycle_registers(trace_out)
+        result = SimulationResult(processor, True)
+        result.estimate = estimate
+        return result
+    if profiler is None:
+        load_program(processor, program_words, disassembly_out)
+        if config.functional:
+            run_functional(processor, trace_out, limit=config.max_cycles)
+        else:
+            pipelining(processor, trace_out, config, hasher=hasher, subscribers=subscribers)
+        return SimulationResult(processor, config.functional)
+    profiler.instrument(processor, HostProfiler.PROCESSING_METHODS)
+    with profiler.section('load_program'):
+        load_program(processor, program_words, disassembly_out)
+    if config.functional:
+        with profiler.section('run_functional'):
+            run_functional(processor, trace_out, limit=config.max_cycles)
+    else:
+        with profiler.section('pipelining'):
+            pipelining(processor, trace_out, config, profiler, hasher=hasher,
+                       subscribers=subscribers)
+    result = SimulationResult(processor, config.functional)
+    result.profile = profiler
+    return result
+
+def resume(checkpoint, config=None, trace_out=None, hash_out=None, subscribers=()):
+    # Carries on a cycle-accurate run from a checkpoint file. The pipeline
+    # shape and counters come from the checkpoint, tracing and further
+    # checkpoints from config. subscribers as for simulate().
+    if config is None:
+        config = SimConfig()
+    hasher = StateHasher(hash_out) if hash_out is not None else None
+    processor = load_checkpoint(checkpoint)
+    if config.stats and processor.stats is None:
+        raise Exception(f"{checkpoint} was taken without performance counters")
+    if not config.profile:
+        pipelining(processor, trace_out, config, resume=True, hasher=hasher,
+                   subscribers=subscribers)
+        return SimulationResult(processor)
+    profiler = HostProfiler()
+    profiler.instrument(processor, HostProfiler.PROCESSING_METHODS)
+    with profiler.section('pipelining'):
+        pipelining(processor, trace_out, config, profiler, resume=True, hasher=hasher,
+                   subscribers=subscribers)
+    result = SimulationResult(processor)
+    result.profile = profiler
+    return result
+
+def check_against_golden(program_words, golden_path, config=None, context=5, trace_out=None):
+    # Runs the program with only the state hasher and compares its stream
+    # with a golden one. Returns the first diverging cycle (None if there is
+    # none); the cycles within context of it are then re-run with a full
+    # trace into trace_out. The re-run starts from the latest checkpoint in
+    # config.checkpoint_dir before the window whose state matches this run,
+    # otherwise from cycle 1, and stops at the end of the window.
+    if config is None:
+        config = SimConfig()
+    if config.functional:
+        raise Exception("A functional run has no state hash stream to compare")
+    stream = io.BytesIO()
+    simulate(program_words, config, None, None, stream)
+    stream.seek(0)
+    run = read_hashes(stream)
+    with open(golden_path, 'rb') as f:
+        golden = read_hashes(f)
+    cycle = first_divergence(golden, run)
+    if cycle is not None and trace_out is not None:
+        window = copy.copy(config)
+        window.trace_mode = 'full'
+        window.trace_every = 1
+        window.trace_window = (max(1, cycle - context), cycle + context)
+        window.checkpoint_every = None
+        processor = window_checkpoint(config.checkpoint_dir, window.trace_window[0], run)
+        if processor is None:
+            processor = Processing(config.pipeline)
+            load_program(processor, program_words)
+            processor.cycle = 1
+        pipelining(processor, trace_out, window, resume=True, last_cycle=window.trace_window[1])
+    return cycle
+
+def window_checkpoint(directory, start, run):
+    # The processor of the latest checkpoint in directory at or before
+    # cycle start, if its state is the one the run (first cycle, digests)
+    # had there; a checkpoint of some other program or run is skipped.
+    taken = latest_checkpoint(directory, start)
+    if taken is None:
+        return None
+    processor = load_checkpoint(checkpoint_path(directory, taken))
+    # a checkpoint holds the state after cycle taken - 1
+    index = taken - 1 - run[0]
+    if index < 0:
+        return None
+    digest = io.BytesIO()
+    hasher = StateHasher(digest)
+    hasher.record(processor)
+    if hasher.last != run[1][8 * index:8 * index + 8]:
+        return None
+    return processor
+
+def simulate_file(input_file, output_dir, config):
+    # Batch worker: one program in, <name>.disassembly.txt and
+    # <name>.simulation.txt out, and a summary row back.
+    name = os.path.splitext(os.path.basename(input_file))[0]
+    row = {'program': name, 'status': 'ok', 'cycles': '', 'instructions': '',
+           'seconds': '', 'error': ''}
+    start = time.perf_counter()
+    try:
+        with open(os.path.join(output_dir, name + '.disassembly.txt'), 'w') as f_dis, \
+             open(os.path.join(output_dir, name + '.simulation.txt'), 'w') as f_sim:
+            result = simulate(read_program(input_file), config, f_dis, f_sim)
+        row['cycles'] = result.cycles
+        row['instructions'] = result.instructions_retired
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = f"{time.perf_counter() - start:.6f}"
+    return row
+
+def run_batch(input_dir, output_dir, config=None, jobs=None):
+    # Runs every *.txt and *.bin program in input_dir on a process pool and
+    # writes the per-program outputs plus summary.csv to output_dir. Outputs
+    # are named after the program without its extension, so each name may
+    # only be used once.
+    if config is None:
+        config = SimConfig()
+    os.makedirs(output_dir, exist_ok=True)
+    programs = sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                      if name.endswith(('.txt', '.bin')))
+    names = [os.path.splitext(os.path.basename(program))[0] for program in programs]
+    for name in set(names):
+        if names.count(name) > 1:
+            raise Exception(f"{input_dir} has more than one program named {name}")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        rows = list(pool.map(simulate_file, programs, [output_dir]*len(programs),
+                             [config]*len(programs), chunksize=max(1, len(programs) // 64)))
+    with open(os.path.join(output_dir, 'summary.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['program', 'status', 'cycles', 'instructions',
+                                               'seconds', 'error'])
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+def sweep_point(program_words, params, config):
+    # Sweep worker: one pipeline shape, no trace. A shape PipelineConfig
+    # rejects is an error row like a failed run.
+    row = dict(params)
+    row.update(status='ok', cycles='', instructions='', ipc='', error='')
+    try:
+        run_config = SimConfig(pipeline=PipelineConfig(**params), expand_idle=config.expand_idle,
+                               max_cycles=config.max_cycles)
+        result = simulate(program_words, run_config)
+        row['cycles'] = result.cycles
+        row['instructions'] = result.instructions_retired
+        row['ipc'] = f"{result.instructions_retired / result.cycles:.4f}"
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f"{type(e).__name__}: {e}"
+    return row
+
+def run_sweep(program_words, grid, config=None, jobs=None):
+    # grid maps PipelineConfig field names to the values to try; every
+    # combination is simulated on a process pool.
+    if config is None:
+        config = SimConfig()
+    names = list(grid)
+    points = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(sweep_point, [program_words]*len(points), points,
+                             [config]*len(points)))
+
+def parse_value(value):
+    # "none" stands for None; anything that is not a number (a predictor
+    # name) stays a string
+    if value == 'none':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def format_value(value):
+    # parse_value() the other way round, for tables the CLI takes back
+    if value is None:
+        return 'none'
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+def parse_parameter(text):
+    # "name=1,2,4" -> ("name", [1, 2, 4])
+    name, _, values = text.partition('=')
+    if name not in PipelineConfig.FIELDS or not values:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(PipelineConfig.FIELDS)} as NAME=VALUE[,VALUE...]")
+    return name, [parse_value(value) for value in values.split(',')]
+
+def parse_window(text):
+    start, _, end = text.partition(':')
+    return (int(start) if start else 1, int(end) if end else float('inf'))
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Five-stage pipeline simulator")
+    parser.add_argument('input_file', nargs='?', help="program as one 32-bit binary word per line")
+    parser.add_argument('--functional', action='store_true',
+                        help="run the ISA only and write just the final Registers/Data block")
+    parser.add_argument('--trace', choices=TraceWriter.MODES, default='full',
+                        help="what simulation.txt records (default: full)")
+    parser.add_argument('--trace-every', type=int, default=1, metavar='N',
+                        help="record only every Nth cycle, plus the last one")
+    parser.add_argument('--trace-window', type=parse_window, metavar='START:END',
+                        help="record only cycles START to END inclusive")
+    parser.add_argument('--idle', choices=('expand', 'compress'), default='expand',
+                        help="how fast-forwarded idle cycles appear in the trace")
+    parser.add_argument('--convert', metavar='OUT',
+                        help="write input_file as a packed binary image to OUT and exit")
+    parser.add_argument('--stats', metavar='FILE',
+                        help="write IPC, stall, occupancy and opcode counters to FILE "
+                        "(CSV if it ends in .csv, JSON otherwise)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="time the simulator's own stages, print a table to stderr and write "
+                        "FILE as a Chrome trace if it ends in .json, collapsed stacks otherwise")
+    parser.add_argument('--checkpoint-every', type=int, metavar='N',
+                        help="save the whole simulator state every N cycles")
+    parser.add_argument('--checkpoint-dir', default='checkpoints', metavar='DIR',
+                        help="where checkpoints are written (default: checkpoints)")
+    parser.add_argument('--resume-from', metavar='PATH',
+                        help="continue from a checkpoint file, or from the latest one in a "
+                        "directory at or before the --trace-window start")
+    parser.add_argument('--hash-out', metavar='FILE',
+                        help="write a compact per-cycle state digest stream to FILE")
+    parser.add_argument('--hash-compare', metavar='GOLDEN',
+                        help="run input_file with only the state hasher, report the first cycle "
+                        "that differs from the GOLDEN stream and trace the cycles around it "
+                        "into divergence.txt")
+    parser.add_argument('--hash-context', type=int, default=5, metavar='N',
+                        help="cycles either side of a divergence to trace (default: 5)")
+    parser.add_argument('--pipeline', type=parse_parameter, action='append', default=[],
+                        metavar='NAME=VALUE', help="set a pipeline parameter, e.g. fetch_width=4")
+    parser.add_argument('--sweep', type=parse_parameter, action='append', default=[],
+                        metavar='NAME=V1,V2', help="sweep a pipeline parameter over values; "
+                        "repeat for a grid, runs input_file at every point in parallel")
+    parser.add_argument('--sweep-out', metavar='FILE', help="also write the sweep table as CSV")
+    parser.add_argument('--batch', metavar='DIR',
+                        help="run every *.txt and *.bin program in DIR in parallel")
+    parser.add_argument('--output-dir', default='batch_output', metavar='DIR',
+                        help="where --batch writes per-program outputs and summary.csv")
+    parser.add_argument('--max-cycles', type=int, metavar='N',
+                        help="fail a run that has not reached break after N cycles (N instructions "
+                        "with --functional), e.g. to keep a runaway --batch program from hanging")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="worker processes for --batch and --sweep (default: all cores)")
+    parser.add_argument('--sample', type=int, metavar='N',
+                        help="sampled run: functional, with a detailed pipeline window every N "
+                        "instructions, and an estimated cycle count")
+    parser.add_argument('--sample-window', type=int, default=2000, metavar='N',
+                        help="instructions measured per detailed window (default: 2000)")
+    parser.add_argument('--sample-warmup', type=int, default=1000, metavar='N',
+                        help="instructions run before each window to fill the pipeline (default: 1000)")
+    parser.add_argument('--sample-out', metavar='FILE',
+                        help="write the estimate and per-window samples of --sample as JSON")
+    parser.add_argument('--lanes', metavar='FILE',
+                        help="run input_file functionally once per data set in FILE (.npy, or "
+                        "one set of data words per line), all at once with NumPy")
+    parser.add_argument('--lanes-out', default='lanes.npz', metavar='FILE',
+                        help="where --lanes writes the final registers and memory of every lane")
+    args = parser.parse_args()
+    if args.trace_every < 1:
+        parser.error("--trace-every must be at least 1")
+    if args.max_cycles is not None and args.max_cycles < 1:
+        parser.error("--max-cycles must be at least 1")
+
+    pipeline = PipelineConfig(**{name: values[-1] for name, values in args.pipeline})
+    config = SimConfig(args.functional, args.trace, args.trace_every, args.trace_window,
+                       args.idle == 'expand', pipeline, args.stats is not None,
+                       args.profile is not None, args.checkpoint_every, args.checkpoint_dir,
+                       args.sample, args.sample_window, args.sample_warmup, args.max_cycles)
+    if args.stats and args.functional:
+        parser.error("--stats needs a cycle-accurate run")
+    if (args.hash_out or args.hash_compare) and args.functional:
+        parser.error("--hash-out and --hash-compare need a cycle-accurate run")
+    if args.sample is not None:
+        if args.sample < 1 or args.sample_window < 1 or args.sample_warmup < 0:
+            parser.error("--sample and --sample-window must be positive, --sample-warmup >= 0")
+        if args.functional or args.stats or args.profile or args.checkpoint_every or \
+                args.resume_from or args.hash_out or args.hash_compare or args.sweep or args.batch:
+            parser.error("--sample is for a single run without --functional, --stats, --profile, "
+                         "checkpoints, hashes, --sweep or --batch")
+    if (args.checkpoint_every or args.resume_from) and (args.functional or args.sweep or args.batch):
+        parser.error("checkpoints are for a single cycle-accurate run")
+    if args.convert:
+        if args.input_file is None:
+            parser.error("--convert needs an input file")
+        write_image(read_program(args.input_file), args.convert)
+    elif args.sweep:
+        if args.input_file is None:
+            parser.error("--sweep needs an input file")
+        grid = {name: [getattr(pipeline, name)] for name in PipelineConfig.FIELDS}
+        grid.update(dict(args.sweep))
+        rows = run_sweep(read_program(args.input_file), grid, config, args.jobs)
+        for row in rows:
+            row.update((name, format_value(row[name])) for name in PipelineConfig.FIELDS)
+        swept = [name for name, _ in args.sweep]
+        columns = swept + ['cycles', 'instructions', 'ipc', 'status']
+        print('\t'.join(columns))
+        for row in rows:
+            print('\t'.join(str(row[column]) for column in columns))
+        if args.sweep_out:
+            with open(args.sweep_out, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(PipelineConfig.FIELDS) +
+                                        ['status', 'cycles', 'instructions', 'ipc', 'error'])
+                writer.writeheader()
+                writer.writerows(rows)
+    elif args.lanes:
+        if args.input_file is None:
+            parser.error("--lanes needs an input file")
+        start = time.perf_counter()
+        result = run_data_batch(read_program(args.input_file), read_data_sets(args.lanes))
+        seconds = time.perf_counter() - start
+        result.write_npz(args.lanes_out)
+        print(f"{len(result)} lanes, {int(result.instructions.sum())} instructions in "
+              f"{seconds:.3f}s, final states in {args.lanes_out}")
+    elif args.batch:
+        rows = run_batch(args.batch, args.output_dir, config, args.jobs)
+        failed = sum(1 for row in rows if row['status'] != 'ok')
+        print(f"{len(rows)} programs, {failed} failed, summary in "
+              f"{os.path.join(args.output_dir, 'summary.csv')}")
+    elif args.hash_compare:
+        if args.input_file is None:
+            parser.error("--hash-compare needs an input file")
+        with open('divergence.txt', 'w') as f_sim:
+            cycle = check_against_golden(read_program(args.input_file), args.hash_compare,
+                                         config, args.hash_context, f_sim)
+        if cycle is None:
+            print("state matches the golden stream")
+        else:
+            print(f"first divergence at cycle {cycle}; cycles {max(1, cycle - args.hash_context)}-"
+                  f"{cycle + args.hash_context} traced in divergence.txt")
+            sys.exit(1)
+    elif args.input_file is None and not args.resume_from:
+        parser.error("an input file, --resume-from or --batch is required")
+    else:
+        if args.resume_from:
+            checkpoint = args.resume_from
+            if os.path.isdir(checkpoint):
+                checkpoint = find_checkpoint(checkpoint, args.trace_window[0] if args.trace_window else None)
+            print(f"resuming from {checkpoint}", file=sys.stderr)
+        with contextlib.ExitStack() as outputs:
+            f_sim = outputs.enter_context(open('simulation.txt', 'w'))
+            f_hash = outputs.enter_context(open(args.hash_out, 'wb')) if args.hash_out else None
+            if args.resume_from:
+                result = resume(checkpoint, config, f_sim, f_hash)
+            else:
+                f_dis = outputs.enter_context(open('disassembly.txt', 'w'))
+                result = simulate(read_program(args.input_file), config, f_dis, f_sim, f_hash)
+        if args.sample is not None:
+            print(result.estimate.summary())
+            if args.sample_out:
+                with open(args.sample_out, 'w') as f:
+                    result.estimate.write_json(f)
+        if args.stats:
+            with open(args.stats, 'w', newline='') as f:
+                if args.stats.endswith('.csv'):
+                    result.stats.write_csv(f)
+                else:
+                    result.stats.write_json(f)
+        if args.profile:
+            sys.stderr.write(result.profile.table())
+            with open(args.profile, 'w') as f:
+                if args.profile.endswith('.json'):
+                    result.profile.write_chrome_trace(f)
+                else:
+                    result.profile.write_collapsed(f)
@@ -0,0 +1,214 @@
+# Decoder microbenchmark: the original string-slicing decoder against the
+# bitfield decoder in VSIM.py.
+#
+#   python -m bench.decode [--words N] [--repeat R]
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from VSIM import DecodedInstruction
+
+FIELDS = ('category', 'type', 'source_1', 'source_2', 'destination', 'immediate',
+          'inst_print', 'is_branch', 'is_logical', 'is_arithematic', 'is_sw_or_lw')
+
+def legacy_twos_complement_to_decimal(binary_string):
+    if binary_string[0] == '1':
+        # If the most significant bit is 1, it's a negative number in two's complement
+        # Perform two's complement operation
+        inverted_bits = ''.join('1' if bit == '0' else '0' for bit in binary_string)
+        decimal_value = -(int(inverted_bits, 2) + 1)
+    else:
+        # If the most significant bit is 0, it's a positive number
+        decimal_value = int(binary_string, 2)
+    return decimal_value
+
+class LegacyInstruction:
+    # The decoder as it was before the bitfield rewrite, copied unchanged so
+    # both the speed and the output can be compared.
+    def __init__(self, binary):
+        self.binary = binary
+        self.inst_count = None
+        self.category = None
+        self.type = None
+        self.active = False
+        self.source_1 = None
+        self.source_2 = None
+        self.destination = None
+        self.immediate = None
+        self.inst_print = None
+        self.stop_moving = False
+        self.temp_ans = None
+        self.is_first_sw = False
+        self.is_branch = False
+        self.is_logical = False
+        self.is_arithematic = False
+        self.is_sw_or_lw = False
+        self.find_category()
+        self.find_type()
+        self.find_src_and_dest_and_imm()
+        self.get_instruction_print()
+
+    def find_category(self):
+        temp_cat = self.binary[30:32]
+        if temp_cat == "00":
+            self.category = 1   
+        elif temp_cat == "01":
+            self.category = 2
+        elif temp_cat == "10":
+            self.category = 3
+        elif temp_cat == "11":
+            self.category = 4
+    
+    def find_type(self) -> str:
+        temp_type = self.binary[25:30]
+        if self.category == 1:
+            if temp_type == "00000":
+                self.type = "beq"
+                self.is_branch = True
+            elif temp_type == "00001":
+                self.type = "bne"
+                self.is_branch = True
+            elif temp_type == "00010":
+                self.type = "blt"
+                self.is_branch = True
+            elif temp_type == "00011":
+                self.type = "sw"
+                self.is_sw_or_lw = True
+
+        elif self.category == 2:
+            if temp_type == "00000":
+                self.type = "add"
+                self.is_arithematic = True
+            elif temp_type == "00001":
+                self.type = "sub"
+                self.is_arithematic = True
+            elif temp_type == "00010":
+                self.type = "and"
+                self.is_logical = True
+            elif temp_type == "00011":
+                self.type = "or"
+                self.is_logical = True
+
+        elif self.category == 3:
+            if temp_type == "00000":
+                self.type = "addi"
+                self.is_arithematic = True
+            elif temp_type == "00001":
+                self.type = "andi"
+                self.is_logical = True                
+            elif temp_type == "00010":
+                self.type = "ori"
+                self.is_logical = True
+            elif temp_type == "00011":
+                self.type = "sll"
+                self.is_logical = True
+            elif temp_type == "00100":
+                self.type = "sra"
+                self.is_logical = True
+            elif temp_type == "00101":
+                self.type = "lw"
+                self.is_sw_or_lw = True
+
+        elif self.category == 4:
+            if temp_type == "00000":
+                self.type = "jal"
+                self.is_branch = True
+            elif temp_type == "11111":
+                self.type = "break"
+    
+    def find_src_and_dest_and_imm(self):
+        if self.category == 1:
+            self.source_1 = int(self.binary[12:17], 2)
+            self.source_2 = int(self.binary[7:12], 2)
+            self.immediate = legacy_twos_complement_to_decimal(self.binary[0:7]+self.binary[20:25])
+        elif self.category == 2:
+            self.source_1 = int(self.binary[12:17], 2)
+            self.source_2 = int(self.binary[7:12], 2)
+            self.destination = int(self.binary[20:25], 2)
+        elif self.category == 3:
+            self.source_1 = int(self.binary[12:17], 2)
+            self.destination = int(self.binary[20:25], 2)
+            self.immediate = legacy_twos_complement_to_decimal(self.binary[0:12])
+        elif self.category == 4:
+            self.immediate = legacy_twos_complement_to_decimal(self.binary[0:20])
+            self.destination = int(self.binary[20:25], 2)
+    
+    def get_instruction_print(self):
+        if self.category == 1:
+            if self.type == "beq" or self.type == "bne" or self.type == "blt":
+                self.inst_print = self.type+" x"+str(self.source_1)+", x"+str(self.source_2)+", #"+str(self.immediate)
+            elif self.type == "sw":
+                self.inst_print = "sw "+"x"+str(self.source_1)+", "+str(self.immediate)+"(x"+str(self.source_2)+")"
+        elif self.category == 2:
+            self.inst_print = self.type+" x"+str(self.destination)+", x"+str(self.source_1)+", x"+str(self.source_2)
+        elif self.category == 3:
+            if self.type == "addi" or self.type == "andi" or self.type == "ori" or self.type == "sll" or self.type == "sra":
+                self.inst_print = self.type+" x"+str(self.destination)+", x"+str(self.source_1)+", #"+str(self.immediate)
+            elif self.type == "lw":
+                self.inst_print = "lw "+"x"+str(self.destination)+", "+str(self.immediate)+"(x"+str(self.source_1)+")"
+        elif self.category == 4:
+            if self.type == 'jal':
+                self.inst_print = "jal "+"x"+str(self.destination)+", #"+str(self.immediate)
+            elif self.type == 'break':
+                self.inst_print = "break"
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    valid_low = [(opcode << 2) | category for category, n in ((0, 4), (1, 4), (2, 6), (3, 1))
+                 for opcode in range(n)] + [(0b11111 << 2) | 3]
+    words = []
+    for _ in range(count):
+        word = (rng.getrandbits(25) << 7) | rng.choice(valid_low)
+        words.append(format(word, '032b'))
+    return words
+
+def check_equivalent(words):
+    for binary in words:
+        old = LegacyInstruction(binary)
+        new = DecodedInstruction(binary)
+        for field in FIELDS:
+            if getattr(old, field) != getattr(new, field):
+                raise AssertionError(f"{binary}: {field} {getattr(old, field)!r} != {getattr(new, field)!r}")
+
+def time_decoder(decoder, words, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for binary in words:
+            decoder(binary)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bytes_per_instance(decoder, words):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [decoder(binary) for binary in words]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # the binary strings are shared by both decoders, so they are not counted
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    total -= sys.getsizeof(kept)
+    return total / len(words)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instruction decoder microbenchmark")
+    parser.add_argument('--words', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    words = random_words(args.words)
+    check_equivalent(words)
+    old_time = time_decoder(LegacyInstruction, words, args.repeat)
+    new_time = time_decoder(DecodedInstruction, words, args.repeat)
+    old_mem = bytes_per_instance(LegacyInstruction, words)
+    new_mem = bytes_per_instance(DecodedInstruction, words)
+    print(f"{'decoder':<10}{'words/s':>14}{'bytes/inst':>12}")
+    print(f"{'legacy':<10}{args.words / old_time:>14,.0f}{old_mem:>12.0f}")
+    print(f"{'bitfield':<10}{args.words / new_time:>14,.0f}{new_mem:>12.0f}")
+    print(f"speedup {old_time / new_time:.1f}x, memory {old_mem / new_mem:.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Synthetic workload generator: writes programs in the input format VSIM.py
+# reads (one 32-bit binary word per line, data after break).
+#
+#   python -m bench.generator [--trips N] [--data N] [--branch-density F]
+#                             [--chain N] [--seed S] [-o FILE]
+#
+# The program is one loop of `trips` iterations. Each iteration loads a data
+# word (the index wraps with a power-of-two mask, so --data is rounded up),
+# runs it through a dependency chain of --chain ALU ops, stores it back and
+# increments the counter. --branch-density is the fraction of loop-body
+# slots that are data-dependent forward branches over one instruction.
+import argparse
+import random
+import sys
+
+CATEGORY_1 = {'beq': 0, 'bne': 1, 'blt': 2, 'sw': 3}
+CATEGORY_2 = {'add': 0, 'sub': 1, 'and': 2, 'or': 3}
+CATEGORY_3 = {'addi': 0, 'andi': 1, 'ori': 2, 'sll': 3, 'sra': 4, 'lw': 5}
+
+# chain ops cycle through these; andi keeps the values bounded
+CHAIN_OPS = ('add', 'ori', 'sub', 'andi')
+
+def field(value, bits):
+    return value & ((1 << bits) - 1)
+
+def encode(op, *operands):
+    # Operands in assembly order, e.g. encode('lw', rd, imm, rs1) for
+    # "lw rd, imm(rs1)". Branch immediates are in halfwords, as in VSIM.py.
+    if op in ('beq', 'bne', 'blt', 'sw'):
+        if op == 'sw':
+            rs1, imm, rs2 = operands
+        else:
+            rs1, rs2, imm = operands
+        imm = field(imm, 12)
+        word = ((imm >> 5) << 25) | (rs2 << 20) | (rs1 << 15) | ((imm & 0x1f) << 7) | (CATEGORY_1[op] << 2)
+    elif op in CATEGORY_2:
+        rd, rs1, rs2 = operands
+        word = (rs2 << 20) | (rs1 << 15) | (rd << 7) | (CATEGORY_2[op] << 2) | 1
+    elif op == 'lw':
+        rd, imm, rs1 = operands
+        word = (field(imm, 12) << 20) | (rs1 << 15) | (rd << 7) | (CATEGORY_3[op] << 2) | 2
+    elif op in CATEGORY_3:
+        rd, rs1, imm = operands
+        word = (field(imm, 12) << 20) | (rs1 << 15) | (rd << 7) | (CATEGORY_3[op] << 2) | 2
+    elif op == 'jal':
+        rd, imm = operands
+        word = (field(imm, 20) << 12) | (rd << 7) | 3
+    elif op == 'break':
+        word = (0b11111 << 2) | 3
+    else:
+        raise Exception(f"Unknown instruction {op}")
+    return format(word, '032b')
+
+def load_constant(rd, value):
+    # addi covers 12 signed bits; larger values are built 11 bits at a time
+    if -2048 <= value < 2048:
+        return [('addi', rd, 0, value)]
+    code = load_constant(rd, value >> 11)
+    code.append(('sll', rd, rd, 11))
+    if value & 0x7ff:
+        code.append(('ori', rd, rd, value & 0x7ff))
+    return code
+
+def generate(trips=1000, data_words=64, branch_density=0.1, chain_length=4, seed=0):
+    # Returns (program words, actual data size).
+    if trips < 0 or data_words < 1 or chain_length < 0 or not 0 <= branch_density < 1:
+        raise Exception("trips and chain length must be >= 0, data size >= 1, branch density in [0, 1)")
+    rng = random.Random(seed)
+    size = 1
+    while size < data_words:
+        size *= 2
+
+    # x1 counter, x2 trips, x3 address, x4 value, x5 index mask, x6 data
+    # base, x7 skipped-instruction counter, x8 chain operand
+    body = [('and', 3, 1, 5), ('sll', 3, 3, 2), ('add', 3, 3, 6), ('lw', 4, 0, 3)]
+    for k in range(chain_length):
+        op = CHAIN_OPS[k % len(CHAIN_OPS)]
+        if op == 'add':
+            body.append(('add', 4, 4, 1))
+        elif op == 'sub':
+            body.append(('sub', 4, 4, 8))
+        elif op == 'andi':
+            body.append(('andi', 4, 4, 0x3ff))
+        else:
+            body.append(('ori', 4, 4, 1 << (k % 8)))
+    body += [('sw', 4, 0, 3), ('addi', 1, 1, 1)]
+    # a branch + the instruction it may skip take two slots
+    branches = int(round(branch_density*len(body)/(1 - branch_density)/2))
+    for n in range(branches):
+        position = 4 + (n*(len(body) - 5))//max(branches, 1)
+        body[position:position] = [('blt', 4, 8, 4), ('addi', 7, 7, 1)]
+
+    setup = [('addi', 1, 0, 0)] + load_constant(2, trips) + load_constant(5, size - 1) + \
+            [('addi', 8, 0, 3)]
+    # loop: exit test, body, back edge; the exit goes straight to break
+    loop = [('beq', 1, 2, (len(body) + 2)*2)] + body + [('beq', 0, 0, -(len(body) + 1)*2)]
+    # the data base depends on how many instructions it takes to load it
+    base_code = []
+    while True:
+        data_base = 256 + 4*(len(setup) + len(base_code) + len(loop) + 1)
+        code = load_constant(6, data_base)
+        stable = len(code) == len(base_code)
+        base_code = code
+        if stable:
+            break
+
+    code = setup + base_code + loop + [('break',)]
+    words = [encode(*inst) for inst in code]
+    words += [format(field(rng.randint(-512, 512), 32), '032b') for _ in range(size)]
+    return words, size
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic VSIM workload generator")
+    parser.add_argument('--trips', type=int, default=1000, help="loop iterations")
+    parser.add_argument('--data', type=int, default=64,
+                        help="data words (rounded up to a power of two)")
+    parser.add_argument('--branch-density', type=float, default=0.1,
+                        help="fraction of loop-body slots that are branches")
+    parser.add_argument('--chain', type=int, default=4, help="dependent ALU ops per iteration")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the data values")
+    parser.add_argument('-o', '--output', help="write here instead of stdout")
+    args = parser.parse_args(argv)
+
+    words, _ = generate(args.trips, args.data, args.branch_density, args.chain, args.seed)
+    text = '\n'.join(words) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Simulator speed benchmark: runs the generated workloads with a full trace
+# and with no trace, each in a fresh child process, and records host seconds,
+# simulated cycles per second and peak RSS.
+#
+#   python -m bench.harness [--repeat R] [--only NAME] [--save FILE]
+#                           [--compare FILE] [--tolerance F]
+#
+# --save writes the results as a JSON baseline; --compare checks a run
+# against one and exits with status 1 if any workload got slower than the
+# tolerance allows or its simulated cycle count changed.
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.generator import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> generate() arguments
+WORKLOADS = {
+    'alu_chain': dict(trips=2000, data_words=16, branch_density=0.0, chain_length=12),
+    'branchy': dict(trips=2000, data_words=64, branch_density=0.4, chain_length=2),
+    'memory': dict(trips=3000, data_words=4096, branch_density=0.0, chain_length=1),
+    'mixed': dict(trips=2000, data_words=256, branch_density=0.15, chain_length=4),
+}
+TRACE_MODES = ('full', 'none')
+
+def run_child(program, trace_mode):
+    # Runs in the child process: one simulation, result as JSON on stdout.
+    from VSIM import SimConfig, read_program, simulate
+    words = read_program(program)
+    with tempfile.TemporaryDirectory() as out:
+        start = time.perf_counter()
+        with open(os.path.join(out, 'simulation.txt'), 'w') as f_sim:
+            result = simulate(words, SimConfig(trace_mode=trace_mode), None, f_sim)
+        seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    json.dump({'seconds': seconds, 'cycles': result.cycles,
+               'instructions': result.instructions_retired, 'peak_rss_kb': rss}, sys.stdout)
+
+def measure(program, trace_mode, repeat):
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-m', 'bench.harness', '--child', program, trace_mode],
+                             cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        run = json.loads(out)
+        if best is None or run['seconds'] < best['seconds']:
+            best = run
+    best['cycles_per_second'] = best['cycles']/best['seconds']
+    return best
+
+def run_suite(names, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as work:
+        for name in names:
+            words, _ = generate(**WORKLOADS[name])
+            program = os.path.join(work, name + '.txt')
+            with open(program, 'w') as f:
+                f.write('\n'.join(words) + '\n')
+            for trace_mode in TRACE_MODES:
+                results[f'{name}/{trace_mode}'] = measure(program, trace_mode, repeat)
+    return results
+
+def compare(results, baseline, tolerance):
+    # Returns the lines to print and whether anything regressed.
+    lines = []
+    regressed = False
+    for key, run in results.items():
+        old = baseline['results'].get(key)
+        if old is None:
+            lines.append(f"{key:<20} not in baseline")
+            continue
+        ratio = run['seconds']/old['seconds']
+        note = ''
+        if run['cycles'] != old['cycles']:
+            note = f"  cycles changed {old['cycles']} -> {run['cycles']}"
+            regressed = True
+        elif ratio > 1 + tolerance:
+            note = '  SLOWER'
+            regressed = True
+        lines.append(f"{key:<20}{old['seconds']:>10.3f}{run['seconds']:>10.3f}{ratio:>8.2f}x{note}")
+    return lines, regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VSIM speed benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per point, best one kept")
+    parser.add_argument('--only', action='append', choices=sorted(WORKLOADS),
+                        help="run just this workload (repeatable)")
+    parser.add_argument('--save', metavar='FILE', help="write the results as a baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="allowed slowdown for --compare (default 0.10 = 10%%)")
+    parser.add_argument('--child', nargs=2, metavar=('PROGRAM', 'TRACE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(*args.child)
+        return 0
+
+    results = run_suite(args.only or list(WORKLOADS), args.repeat)
+    print(f"{'workload':<20}{'seconds':>10}{'cycles':>10}{'cycles/s':>12}{'peak RSS MB':>13}")
+    for key, run in results.items():
+        print(f"{key:<20}{run['seconds']:>10.3f}{run['cycles']:>10}"
+              f"{run['cycles_per_second']:>12,.0f}{run['peak_rss_kb'] / 1024:>13.1f}")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'workloads': {name: WORKLOADS[name] for name in args.only or WORKLOADS},
+                       'results': results}, f, indent=2)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print(f"\n{'vs baseline':<20}{'before':>10}{'after':>10}{'ratio':>9}")
+        for line in lines:
+            print(line)
+        return 1 if regressed else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# Regression tests for VSIM.py; programs are built with bench.generator.
+import csv
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from VSIM import (PerfCounters, PipelineConfig, Processing, SimConfig, check_against_golden,
+                  format_value, load_program, parse_value, read_program, run_batch, simulate,
+                  write_image)
+from bench.generator import encode, generate
+
+def program(*code, data=()):
+    return [encode(*inst) for inst in code] + [encode('break')] + \
+           [format(value & 0xffffffff, '032b') for value in data]
+
+def run(words, **options):
+    trace = io.StringIO()
+    result = simulate(words, SimConfig(**options), None, trace)
+    return result, trace.getvalue()
+
+@pytest.mark.parametrize('predictor', ['taken', 'not-taken', '2bit', 'btb'])
+def test_predictor_on_program_image(tmp_path, predictor):
+    words, _ = generate(trips=20, data_words=8, branch_density=0.3)
+    path = str(tmp_path / 'p.bin')
+    write_image(words, path)
+    pipeline = PipelineConfig(predictor=predictor)
+    image_result, image_trace = run(read_program(path), pipeline=pipeline)
+    text_result, text_trace = run(words, pipeline=pipeline)
+    assert image_result.cycles == text_result.cycles
+    assert image_trace == text_trace
+
+def wide_store_program():
+    # x1 = 1 << 70 stored to the second data word; the addis keep break out
+    # of the store's fetch group
+    return program(('addi', 1, 0, 1), ('sll', 1, 1, 70), ('sw', 1, 300, 0),
+                   *[('addi', 2, 2, 1)]*6, data=[0]*5)
+
+@pytest.mark.parametrize('options', [dict(), dict(functional=True), dict(trace_mode='delta')])
+def test_store_wider_than_64_bits(options):
+    result, trace = run(wide_store_program(), **options)
+    assert result.memory[300] == 1 << 70
+    assert str(1 << 70) in trace
+
+def test_store_wider_than_64_bits_hashed():
+    hashes = io.BytesIO()
+    result = simulate(wide_store_program(), SimConfig(trace_mode='none'), None, None, hashes)
+    assert result.memory[300] == 1 << 70
+    assert hashes.getvalue()
+
+@pytest.mark.parametrize('code, error', [
+    # break fetched behind the store in one group never leaves pre-issue
+    ([('addi', 1, 0, 1), ('sll', 1, 1, 5), ('sw', 1, 284, 0)], 'deadlocked'),
+    ([('addi', 1, 0, 1), ('addi', 2, 0, 2), ('sw', 1, 4000, 0)], 'out of bounds'),
+])
+def test_failed_run_keeps_partial_trace(code, error):
+    trace = io.StringIO()
+    hashes = io.BytesIO()
+    with pytest.raises(Exception, match=error):
+        simulate(program(*code, data=[0]*5), SimConfig(), None, trace, hashes)
+    assert trace.getvalue().startswith('-'*20 + '\nCycle 1:\n')
+    assert 'Cycle 4:' in trace.getvalue()
+    assert len(hashes.getvalue()) > 16
+
+@pytest.mark.parametrize('every', [0, -3])
+def test_trace_every_must_be_positive(every):
+    with pytest.raises(Exception, match='trace_every'):
+        SimConfig(trace_every=every)
+
+def endless_program():
+    return [encode('beq', 0, 0, 0), encode('break'), format(0, '032b')]
+
+@pytest.mark.parametrize('functional', [False, True])
+def test_max_cycles_stops_a_runaway_program(functional):
+    with pytest.raises(Exception, match='No break after 500'):
+        run(endless_program(), functional=functional, max_cycles=500)
+
+def test_batch_records_runaway_program(tmp_path):
+    programs = tmp_path / 'programs'
+    programs.mkdir()
+    (programs / 'loop.txt').write_text('\n'.join(endless_program()) + '\n')
+    (programs / 'done.txt').write_text('\n'.join(program(('addi', 1, 0, 7), ('addi', 2, 0, 1))) + '\n')
+    write_image(program(('addi', 1, 0, 9), ('addi', 2, 0, 1)), str(programs / 'image.bin'))
+    output = str(tmp_path / 'out')
+    run_batch(str(programs), output, SimConfig(max_cycles=1000), jobs=2)
+    with open(os.path.join(output, 'summary.csv'), newline='') as f:
+        rows = {row['program']: row for row in csv.DictReader(f)}
+    assert rows['done']['status'] == 'ok'
+    assert rows['image']['status'] == 'ok'
+    assert os.path.exists(os.path.join(output, 'image.simulation.txt'))
+    assert rows['loop']['status'] == 'error'
+    assert 'No break after 1000 cycles' in rows['loop']['error']
+
+def test_batch_rejects_clashing_names(tmp_path):
+    words = program(('addi', 1, 0, 7), ('addi', 2, 0, 1))
+    (tmp_path / 'p.txt').write_text('\n'.join(words) + '\n')
+    write_image(words, str(tmp_path / 'p.bin'))
+    with pytest.raises(Exception, match='more than one program named p'):
+        run_batch(str(tmp_path), str(tmp_path / 'out'))
+
+@pytest.mark.parametrize('value', [None, 'none', '2bit', 4, 0, 1])
+def test_format_value_round_trips(value):
+    assert format_value(parse_value(format_value(value))) == format_value(value)
+
+def test_sweep_table_uses_cli_spelling(tmp_path):
+    path = tmp_path / 'p.txt'
+    path.write_text('\n'.join(program(('addi', 1, 0, 7), ('addi', 2, 0, 1))) + '\n')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, os.path.join(root, 'VSIM.py'), '--sweep', 'predictor=none,2bit',
+                          '--sweep', 'forwarding=0,1', str(path)],
+                         cwd=tmp_path, check=True, capture_output=True, text=True).stdout
+    rows = [line.split('\t')[:2] for line in out.splitlines()[1:]]
+    assert sorted(rows) == [['2bit', '0'], ['2bit', '1'], ['none', '0'], ['none', '1']]
+
+def store_load_program(fillers=10):
+    # the sw is ready before the older loads to x5 have issued; the younger
+    # lw of the same word must still see its 7. The fillers let it retire
+    # before break ends the run
+    data = 256 + 4*(6 + fillers)
+    return program(('addi', 2, 0, 7), ('lw', 5, data, 0), ('lw', 5, data + 4, 0),
+                   ('sw', 2, data + 8, 0), ('lw', 4, data + 8, 0), *[('addi', 6, 6, 1)]*fillers,
+                   data=[1, 2, 3, 0])
+
+def test_load_after_held_store_with_forwarding():
+    result, _ = run(store_load_program(), pipeline=PipelineConfig(forwarding=True))
+    assert result.registers[4] == 7
+
+@pytest.mark.parametrize('write', ['back', 'through'])
+def test_load_after_held_store_with_cache(write):
+    result, _ = run(store_load_program(40), pipeline=PipelineConfig(cache_sets=4, cache_write=write))
+    assert result.registers[4] == 7
+
+def independent_program():
+    # long runs of independent ALU and memory ops keep every pre-ALU queue
+    # busy; the closing jal makes break the first of its fetch group
+    data = 256 + 4*(3*30 + 2)
+    code = [('addi', r, 0, r) for r in range(1, 31)]
+    code += [('ori', r, 0, r) for r in range(1, 31)]
+    code += [('lw', r, data + 4*(r % 4), 0) for r in range(1, 31)]
+    return program(*code, ('jal', 0, 2), data=[1, 2, 3, 4])
+
+@pytest.mark.parametrize('size', [1, 2, 3, 4, 6])
+@pytest.mark.parametrize('queue', ['pre_alu1_size', 'pre_alu2_size', 'pre_alu3_size'])
+def test_queue_sizes_stay_within_bounds(queue, size):
+    pipeline = PipelineConfig(**{queue: size}, pre_issue_size=8, fetch_width=4, alu1_units=2)
+    processor = Processing(pipeline)
+    load_program(processor, independent_program())
+    processor.stats = PerfCounters(processor)
+    for record in processor.cycles():
+        processor.stats.end_cycle(processor)
+        for latch in processor.latches:
+            assert latch.right.count <= latch.size
+    assert record.stop
+
+@pytest.mark.parametrize('name', ['pre_issue_size', 'pre_alu2_size', 'fetch_width', 'alu1_units',
+                                  'predictor_entries', 'cache_ways'])
+def test_pipeline_rejects_none_for_required_sizes(name):
+    with pytest.raises(Exception, match=f'{name} must be a positive integer'):
+        PipelineConfig(**{name: None})
+
+def test_pipeline_accepts_none_where_optional():
+    pipeline = PipelineConfig(issue_width=None, cache_sets=None)
+    assert pipeline.issue_width is None and pipeline.cache_sets is None
+
+def corrupted_golden(words, path, cycle):
+    stream = io.BytesIO()
+    simulate(words, SimConfig(trace_mode='none'), None, None, stream)
+    digests = bytearray(stream.getvalue())
+    digests[16 + 8*(cycle - 1)] ^= 0xff
+    path.write_bytes(bytes(digests))
+
+def test_divergence_window_resumes_from_checkpoint(tmp_path):
+    words, _ = generate(trips=200, data_words=16, branch_density=0.2)
+    golden = tmp_path / 'golden.hsh'
+    corrupted_golden(words, golden, 1500)
+    fresh = io.StringIO()
+    assert check_against_golden(words, str(golden), SimConfig(), 3, fresh) == 1500
+    resumed = io.StringIO()
+    config = SimConfig(checkpoint_every=400, checkpoint_dir=str(tmp_path / 'ck'))
+    assert check_against_golden(words, str(golden), config, 3, resumed) == 1500
+    assert len(os.listdir(tmp_path / 'ck')) >= 3
+    assert resumed.getvalue() == fresh.getvalue()
+    assert resumed.getvalue().count('Cycle ') == 7
+
+def test_divergence_check_rejects_functional(tmp_path):
+    with pytest.raises(Exception, match='functional'):
+        check_against_golden(program(('addi', 1, 0, 1), ('addi', 2, 0, 1)), str(tmp_path / 'g.hsh'),
+                             SimConfig(functional=True))
+
+def test_ordinary_run_does_not_import_numpy(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = tmp_path / 'p.txt'
+    path.write_text('\n'.join(generate(trips=10)[0]) + '\n')
+    code = ("import sys, VSIM\n"
+            "VSIM.simulate(VSIM.read_program(sys.argv[1]), VSIM.SimConfig(trace_mode='none'))\n"
+            "assert 'numpy' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code, str(path)], cwd=root, check=True)
+
+def test_data_batch_matches_scalar_runs():
+    pytest.importorskip('numpy')
+    from VSIM import run_data_batch
+    words, size = generate(trips=30, data_words=8, branch_density=0.3)
+    code = words[:len(words) - size]
+    data_sets = [[(lane * 7 + k) % 50 - 20 for k in range(size)] for lane in range(5)]
+    result = run_data_batch(words, data_sets)
+    for lane, data in enumerate(data_sets):
+        scalar = simulate(code + [format(v & 0xffffffff, '032b') for v in data], SimConfig(functional=True))
+        assert result.lane(lane) == (scalar.registers, scalar.memory)